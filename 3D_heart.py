@@ -1,8 +1,19 @@
+import argparse
 import pygame
 import math
-import random
+from itertools import islice
+
+import numpy as np
 from pygame.locals import *
 
+from frame_clock import FixedTimestep, frames
+from frame_profiler import FrameProfiler, add_profiler_arguments, profiler_from_args
+from frame_random import FrameRandom, add_random_arguments
+from quality_governor import add_governor_arguments, governor_from_args, scaled
+from sprite_atlas import CircleAtlas, SpriteBatch
+
+ENGINES = ('python', 'numpy')
+
 
 class Vector3:
     """三维向量类"""
@@ -50,9 +61,32 @@ class Vector3:
         )
 
 
+def rotation_matrix(axis, angle):
+    """绕任意轴旋转的3x3矩阵（与Vector3.rotate相同的公式）"""
+    cos = math.cos(angle)
+    sin = math.sin(angle)
+    t = 1 - cos
+    axis = axis.normalize()
+    x, y, z = axis.x, axis.y, axis.z
+
+    return np.array([
+        [t * x * x + cos, t * x * y - z * sin, t * x * z + y * sin],
+        [t * x * y + z * sin, t * y * y + cos, t * y * z - x * sin],
+        [t * x * z - y * sin, t * y * z + x * sin, t * z * z + cos]
+    ])
+
+
+# 满画质时每个粒子每帧画高光的概率
+HIGHLIGHT_CHANCE = 0.1
+
+
 class ParticleHeart:
-    def __init__(self, width=800, height=600):
-        pygame.init()
+    def __init__(self, width=800, height=600, particle_count=3000, engine='python', sprites=False,
+                 sim_hz=60, fps=60, seed=None):
+        if engine not in ENGINES:
+            raise ValueError(f"未知引擎 {engine!r}，可选 {ENGINES}")
+
+        pygame.display.init()  # 只初始化视频子系统
         self.screen = pygame.display.set_mode((width, height), RESIZABLE)
         self.clock = pygame.time.Clock()
         self.width, self.height = width, height
@@ -70,10 +104,21 @@ class ParticleHeart:
         self.light_dir = Vector3(1, 1, -1).normalize()
 
         # 心形参数
+        self.engine = engine  # 'python': 逐粒子字典, 'numpy': N×3数组
+        # 可选：粒子走精灵图集 + 批量blit
+        self.sprite_batch = SpriteBatch(CircleAtlas()) if sprites else None
         self.particles = []
-        self.init_particles(3000)  # 粒子数量
-
-        # 动画参数
+        self.particle_count = particle_count
+        # 共享随机源：初始分布和每帧的高光都从这里批量取数，固定seed可逐位复现
+        self.rng = FrameRandom(seed)
+        self.init_particles(particle_count)  # 粒子数量
+        # 参与更新和绘制的粒子前缀、高光概率，由apply_quality调整
+        self.active_count = particle_count
+        self.highlight_chance = HIGHLIGHT_CHANCE
+
+        # 动画参数：模拟按sim_hz固定步长推进，渲染帧率上限为fps
+        self.sim_hz = sim_hz
+        self.fps = fps
         self.angle = 0
         self.beat_phase = 0
         self.rotation_speed = 0.02
@@ -82,9 +127,10 @@ class ParticleHeart:
 
     def init_particles(self, count):
         """初始化3D心形粒子"""
-        for _ in range(count):
-            u = random.uniform(0, 2 * math.pi)
-            v = random.uniform(-math.pi / 2, math.pi / 2)
+        us = self.rng.uniform(0, 2 * math.pi, count).tolist()
+        vs = self.rng.uniform(-math.pi / 2, math.pi / 2, count).tolist()
+        picks = self.rng.choice(len(self.colors), count).tolist()
+        for u, v, pick in zip(us, vs, picks):
 
             # 心形参数方程（3D）
             x = 16 * (math.sin(u) ** 3) * (1 + 0.2 * math.cos(v))
@@ -98,10 +144,30 @@ class ParticleHeart:
             self.particles.append({
                 'pos': pos,
                 'origin': pos,  # 存储原始位置
+                'prev': pos,  # 上一模拟步的位置（渲染插值用）
                 'velocity': velocity,
-                'color': random.choice(self.colors)
+                'color': self.colors[pick]
             })
 
+        if self.engine == 'numpy':
+            self.init_particle_arrays()
+
+    def init_particle_arrays(self):
+        """把粒子字典转换为N×3数组（numpy引擎）"""
+        self.origins = np.array([(p['origin'].x, p['origin'].y, p['origin'].z) for p in self.particles])
+        self.positions = self.origins.copy()
+        self.prev_positions = self.origins.copy()
+        self.velocities = np.zeros_like(self.origins)
+        self.base_colors = np.array([p['color'] for p in self.particles], dtype=np.float64)
+        self.display_colors = self.base_colors.astype(np.uint8)
+        self.tilt = rotation_matrix(Vector3(1, 0, 0), math.radians(20))
+        self.particles = []
+
+    def apply_quality(self, quality):
+        """按画质（0..1）缩放活跃粒子数和高光；其余粒子保留状态，不重新分配"""
+        self.active_count = scaled(self.particle_count, quality, 1)
+        self.highlight_chance = HIGHLIGHT_CHANCE * quality
+
     def project(self, point):
         """3D投影到2D屏幕（简单透视投影）"""
         fov = 256  # 视野系数
@@ -115,16 +181,23 @@ class ParticleHeart:
         intensity = max(0, normal.dot(self.light_dir)) * 0.8 + 0.2
         return min(max(intensity, 0.3), 1.0)
 
-    def update_particles(self):
-        """更新粒子物理状态"""
-        self.angle += self.rotation_speed
-        self.beat_phase += self.beat_speed / 60
+    def update_particles(self, dt=1 / 60):
+        """更新粒子物理状态，推进dt秒（原始参数按每1/60秒一步给出）"""
+        k = frames(dt)
+        self.angle += self.rotation_speed * k
+        self.beat_phase += self.beat_speed * dt
 
         # 计算心跳变形
         beat = (math.sin(self.beat_phase) * 0.5 + 0.5) * self.beat_strength + 1
         beat_vec = Vector3(beat, beat, beat * 0.8)
 
-        for p in self.particles:
+        if self.engine == 'numpy':
+            self.update_particle_arrays(beat_vec, k)
+            return
+
+        damping = 0.9 ** k
+
+        for p in islice(self.particles, self.active_count):
             # 基础动画：旋转 + 心跳
             rotated = p['origin'].rotate(Vector3(0, 1, 0), self.angle)
             rotated = rotated.rotate(Vector3(1, 0, 0), math.radians(20))
@@ -137,9 +210,10 @@ class ParticleHeart:
             )
 
             # 物理模拟（弹簧效果）
-            force = (target_pos - p['pos']) * 0.1
-            p['velocity'] = p['velocity'] * 0.9 + force
-            p['pos'] = p['pos'] + p['velocity']
+            force = (target_pos - p['pos']) * (0.1 * k)
+            p['velocity'] = p['velocity'] * damping + force
+            p['prev'] = p['pos']
+            p['pos'] = p['pos'] + p['velocity'] * k
 
             # 计算法线（用于光照）
             dx = math.sin(p['pos'].x * 0.5) * 0.3
@@ -150,38 +224,148 @@ class ParticleHeart:
             light = self.calculate_lighting(normal)
             p['display_color'] = tuple(min(255, int(c * light)) for c in p['color'])
 
-    def draw(self):
-        """绘制粒子系统"""
+    def update_particle_arrays(self, beat_vec, k=1.0):
+        """批量更新粒子：一次组合旋转+心跳缩放，弹簧、光照整体计算（numpy引擎）
+
+        k为本步相当于多少个1/60秒帧。
+        """
+        # 只更新活跃前缀（视图，不复制）
+        n = self.active_count
+        positions, velocities = self.positions[:n], self.velocities[:n]
+
+        # 旋转 + 心跳合并为一个矩阵，每帧只构造一次
+        rotation = self.tilt @ rotation_matrix(Vector3(0, 1, 0), self.angle)
+        transform = np.array([beat_vec.x, beat_vec.y, beat_vec.z])[:, None] * rotation
+        target = self.origins[:n] @ transform.T
+
+        # 物理模拟（弹簧效果）
+        velocities *= 0.9 ** k
+        velocities += (target - positions) * (0.1 * k)
+        self.prev_positions[:n] = positions
+        positions += velocities * k
+
+        # 计算法线（用于光照）
+        normals = np.empty_like(positions)
+        normals[:, 0] = np.sin(positions[:, 0] * 0.5) * 0.3
+        normals[:, 1] = np.cos(positions[:, 1] * 0.5) * 0.3
+        normals[:, 2] = 1
+        normals /= np.linalg.norm(normals, axis=1)[:, None]
+
+        # 更新颜色
+        light_dir = np.array([self.light_dir.x, self.light_dir.y, self.light_dir.z])
+        light = np.maximum(normals @ light_dir, 0) * 0.8 + 0.2
+        np.clip(light, 0.3, 1.0, out=light)
+        colors = self.base_colors[:n] * light[:, None]
+        np.minimum(colors, 255, out=colors)
+        self.display_colors[:n] = colors
+
+    def project_arrays(self, points):
+        """批量3D投影到2D屏幕（与project相同的透视公式）"""
+        fov = 256  # 视野系数
+        scale = self.height / (self.height + points[:, 2]) * fov
+        x = self.width / 2 + (points[:, 0] - self.camera_pos.x) * scale
+        y = self.height / 2 + (points[:, 1] - self.camera_pos.y) * scale
+        # astype按零截断，与int()一致
+        return x.astype(np.int64), y.astype(np.int64)
+
+    def draw_particle_arrays(self, alpha=1.0):
+        """按argsort得到的深度顺序批量绘制（numpy引擎）"""
+        # 在上一步和当前步之间插值（只取活跃前缀）
+        n = self.active_count
+        positions = self.positions[:n]
+        if alpha < 1.0:
+            prev = self.prev_positions[:n]
+            positions = prev + (positions - prev) * alpha
+
+        # 根据深度排序粒子（从远到近），稳定排序与sorted(reverse=True)顺序一致
+        z = positions[:, 2]
+        order = np.argsort(-z, kind='stable')
+        xs, ys = self.project_arrays(positions[order])
+        sizes = np.maximum(1, (3 - z[order] * 0.05).astype(np.int64))
+        visible = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        colors = self.display_colors[order][visible].tolist()
+
+        draw_circle = self.draw_circle
+        screen = self.screen
+        highlights = self.rng.random(len(colors)) < self.highlight_chance
+        for x, y, size, color, highlight in zip(xs[visible].tolist(), ys[visible].tolist(),
+                                                sizes[visible].tolist(), colors, highlights.tolist()):
+            draw_circle(screen, color, (x, y), size)
+
+            # 添加高光
+            if highlight:
+                draw_circle(screen, (255, 255, 255, 100), (x, y), size + 1, 1)
+        self.flush_circles(screen)
+
+    def draw_circle(self, surface, color, pos, radius, width=0):
+        """pygame.draw.circle；启用精灵图集时改为排队，由flush_circles统一blits
+
+        屏幕表面没有逐像素alpha，draw.circle会忽略颜色里的alpha，精灵按不透明处理。
+        """
+        if self.sprite_batch is None:
+            pygame.draw.circle(surface, color, pos, radius, width)
+        else:
+            self.sprite_batch.add(pos[0], pos[1], radius, color[:3], 255, width)
+
+    def flush_circles(self, surface):
+        if self.sprite_batch is not None:
+            self.sprite_batch.flush(surface)
+
+    def draw(self, alpha=1.0):
+        """绘制粒子系统；alpha为渲染插值系数（0: 上一模拟步, 1: 当前步）"""
         self.screen.fill((25, 25, 35))  # 深空背景
 
+        if self.engine == 'numpy':
+            self.draw_particle_arrays(alpha)
+            self.draw_light_indicator()
+            return
+
+        # 在上一步和当前步之间插值
+        particles = islice(self.particles, self.active_count)
+        if alpha < 1.0:
+            positions = [(p['prev'] + (p['pos'] - p['prev']) * alpha, p) for p in particles]
+        else:
+            positions = [(p['pos'], p) for p in particles]
+
         # 根据深度排序粒子（从远到近）
-        sorted_particles = sorted(self.particles,
-                                  key=lambda p: p['pos'].z,
+        sorted_particles = sorted(positions,
+                                  key=lambda item: item[0].z,
                                   reverse=True)
 
-        for p in sorted_particles:
-            x, y = self.project(p['pos'])
+        # 每个粒子是否画高光，一次取出整帧的随机数
+        highlights = (self.rng.random(len(sorted_particles)) < self.highlight_chance).tolist()
+        for (pos, p), highlight in zip(sorted_particles, highlights):
+            x, y = self.project(pos)
             if 0 <= x < self.width and 0 <= y < self.height:
-                size = max(1, int(3 - p['pos'].z * 0.05))
-                pygame.draw.circle(self.screen, p['display_color'], (x, y), size)
+                size = max(1, int(3 - pos.z * 0.05))
+                self.draw_circle(self.screen, p['display_color'], (x, y), size)
 
                 # 添加高光
-                if random.random() < 0.1:
-                    pygame.draw.circle(self.screen,
-                                       (255, 255, 255, 100),
-                                       (x, y), size + 1, 1)
+                if highlight:
+                    self.draw_circle(self.screen,
+                                     (255, 255, 255, 100),
+                                     (x, y), size + 1, 1)
+        self.flush_circles(self.screen)
 
-        # 绘制光源方向指示
+        self.draw_light_indicator()
+
+    def draw_light_indicator(self):
+        """绘制光源方向指示"""
         light_x = int(self.width / 2 + self.light_dir.x * 50)
         light_y = int(self.height / 2 + self.light_dir.y * 50)
         pygame.draw.line(self.screen, (255, 255, 0),
                          (self.width // 2, self.height // 2),
                          (light_x, light_y), 2)
 
-    def run(self):
-        """主循环"""
+    def run(self, profiler=None, governor=None):
+        """主循环（F3切换分阶段计时叠加层）；governor为可选的QualityGovernor"""
+        profiler = profiler or FrameProfiler()
+        sim_clock = FixedTimestep(self.sim_hz)
         while self.running:
+            profiler.begin_frame()
             for event in pygame.event.get():
+                if profiler.handle_event(event):
+                    continue
                 if event.type == QUIT:
                     self.running = False
                 elif event.type == KEYDOWN:
@@ -192,14 +376,37 @@ class ParticleHeart:
                 elif event.type == VIDEORESIZE:
                     self.width, self.height = event.size
                     self.screen = pygame.display.set_mode((self.width, self.height), RESIZABLE)
-
-            self.update_particles()
-            self.draw()
+            profiler.lap('event')
+
+            for _ in range(sim_clock.advance()):
+                self.update_particles(sim_clock.dt)
+            profiler.lap('update')
+            self.draw(sim_clock.alpha)
+            profiler.draw_overlay(self.screen)
+            profiler.lap('draw')
             pygame.display.flip()
-            self.clock.tick(60)
+            profiler.lap('flip')
+            self.clock.tick(self.fps)
+            profiler.end_frame()
+            if governor is not None and governor.update(profiler.work_ms):
+                self.apply_quality(governor.quality)
 
+        profiler.close()
         pygame.quit()
 
 
 if __name__ == "__main__":
-    ParticleHeart().run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="3D粒子爱心")
+    parser.add_argument('--engine', choices=ENGINES, default='python',
+                        help="粒子引擎：逐粒子python循环或numpy批量数组")
+    parser.add_argument('--particles', type=int, default=3000, help="粒子数量")
+    parser.add_argument('--sprites', action='store_true', help="粒子使用精灵图集批量绘制")
+    parser.add_argument('--sim-hz', type=float, default=60, help="物理模拟频率")
+    parser.add_argument('--fps', type=int, default=60, help="渲染帧率上限（0为不限）")
+    add_profiler_arguments(parser)
+    add_governor_arguments(parser)
+    add_random_arguments(parser)
+    args = parser.parse_args()
+    heart = ParticleHeart(particle_count=args.particles, engine=args.engine, sprites=args.sprites,
+                          sim_hz=args.sim_hz, fps=args.fps, seed=args.seed)
+    heart.run(profiler_from_args(args), governor_from_args(args))
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""claude_heart 渲染路径基准：立即模式 vs 缓冲批量绘制 vs 着色器动画
+
+默认使用SDL的offscreen驱动和Mesa软件渲染器（llvmpipe），不需要显示器：
+
+    python bench_claude_heart.py --counts 2000 20000 --frames 120
+
+立即模式在大粒子数下非常慢，可用 --max-immediate 限制它参与的规模。
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+os.environ.setdefault('LIBGL_ALWAYS_SOFTWARE', '1')
+# offscreen驱动通过EGL创建上下文，PyOpenGL需要用同一平台查询当前上下文
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+
+import numpy as np
+import pygame
+from pygame.locals import DOUBLEBUF, OPENGL
+from OpenGL.GL import glFinish, glGetString, GL_RENDERER
+
+import claude_heart
+from frame_random import FrameRandom
+
+DISPLAY = (300, 200)
+
+# 模式名 -> 是否使用VBO
+MODES = {'immediate': False, 'client-array': False, 'vbo': True, 'shader': True}
+
+
+def bench(mode, count, frames, use_vbo=True):
+    """在固定时钟下渲染frames帧，返回每帧耗时（毫秒）"""
+    pygame.display.set_mode(DISPLAY, DOUBLEBUF | OPENGL)
+    claude_heart.setup_gl(DISPLAY)
+
+    if mode == 'shader':
+        particles = []
+        arrays = claude_heart.generate_heart_arrays(count, FrameRandom(0))
+        buffer = claude_heart.ShaderParticleCloud(*arrays)
+    else:
+        particles = claude_heart.generate_heart_particles(count, FrameRandom(0))
+        buffer = claude_heart.ParticleBuffer(particles, use_vbo) if mode != 'immediate' else None
+
+    timings = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        claude_heart.render_frame(particles, frame / 60, buffer)
+        glFinish()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    if buffer is not None:
+        buffer.delete()
+    return np.array(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[2000, 20000])
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--max-immediate', type=int, default=20000,
+                        help="跳过粒子数大于此值的immediate/client-array/vbo测试（逐粒子生成太慢）")
+    args = parser.parse_args()
+
+    pygame.display.init()
+    pygame.display.set_mode(DISPLAY, DOUBLEBUF | OPENGL)
+    print(f"renderer: {glGetString(GL_RENDERER).decode()}")
+    print(f"{'mode':<16}{'particles':>10}{'mean ms':>10}{'p99 ms':>10}")
+
+    for count in args.counts:
+        for mode in args.modes:
+            if mode != 'shader' and count > args.max_immediate:
+                continue
+            timings = bench(mode, count, args.frames, MODES[mode])
+            print(f"{mode:<16}{count:>10}{timings.mean():>10.2f}{np.percentile(timings, 99):>10.2f}")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""dance_heart 粒子间斥力基准：空间哈希网格 vs 两两比较
+
+粒子分布取自 dance_heart 稳定后的状态（沿心形轮廓、带少量抖动），不需要显示器：
+
+    python bench_spatial_hash.py --counts 2000 20000 200000 --frames 20
+
+两两比较是 O(n²)，只在粒子数不超过 --max-naive 时测试，并分块计算以限制内存。
+"""
+import argparse
+import time
+
+import numpy as np
+
+from dance_physics import REPULSION_RADIUS, REPULSION_STRENGTH
+from heart_geometry import heart_outline
+from spatial_hash import SpatialHash, repulsion_forces
+
+SIZE = (800, 600)
+
+
+def heart_particles(count, rng, jitter=1.5):
+    """count个粒子按 dance_heart 的 i % len(shape) 分配在心形轮廓上"""
+    shape = heart_outline('classic', 300)
+    pos = shape[np.arange(count) % len(shape)] * (10, -10) + (SIZE[0] // 2, SIZE[1] // 2)
+    return pos + rng.normal(0, jitter, size=pos.shape)
+
+
+def naive_forces(pos, radius, strength, chunk=1024):
+    """两两比较的参考实现（重合粒子不受力）"""
+    force = np.zeros_like(pos)
+    for first in range(0, len(pos), chunk):
+        delta = pos[first:first + chunk, None, :] - pos[None, :, :]
+        dist = np.sqrt(np.einsum('ijk,ijk->ij', delta, delta))
+        near = (dist < radius) & (dist > 0)
+        magnitude = np.where(near, strength * (1 - dist / radius) / np.where(near, dist, 1), 0)
+        force[first:first + chunk] = np.einsum('ij,ijk->ik', magnitude, delta)
+    return force
+
+
+def bench(function, frames):
+    timings = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[2000, 20000, 200000])
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--max-naive', type=int, default=20000,
+                        help="跳过粒子数大于此值的两两比较测试")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    radius, strength = REPULSION_RADIUS, REPULSION_STRENGTH
+    print(f"{'method':<10}{'particles':>10}{'mean ms':>10}{'p99 ms':>10}{'ns/particle':>13}")
+    for count in args.counts:
+        pos = heart_particles(count, np.random.default_rng(args.seed))
+        cases = {
+            'build': lambda: SpatialHash(pos, radius),
+            'grid': lambda: repulsion_forces(pos, radius, strength),
+        }
+        if count <= args.max_naive:
+            cases['naive'] = lambda: naive_forces(pos, radius, strength)
+        for method, function in cases.items():
+            timings = bench(function, args.frames if method != 'naive' else max(1, args.frames // 10))
+            print(f"{method:<10}{count:>10}{timings.mean():>10.2f}{np.percentile(timings, 99):>10.2f}"
+                  f"{timings.mean() * 1e6 / count:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""无窗口基准测试：逐个场景跑固定帧数，输出帧时间统计
+
+pygame场景使用SDL的dummy视频驱动；claude_heart需要OpenGL上下文，
+使用offscreen驱动（Mesa软件渲染）。时钟固定为每帧1/60秒，随机数固定种子，
+所以同一台机器上的两次运行可以直接比较：
+
+    python benchmark.py                          # 全部场景，默认规模
+    python benchmark.py dance_heart --counts 2000 20000 --sizes 800x600 1920x1080
+    python benchmark.py --frames 300 --output baseline.json
+    python benchmark.py g_heart dance_heart --sprites   # 粒子走精灵图集批量blit
+
+每个(场景, 粒子数, 分辨率)组合输出一条JSON记录：平均、p50、p99帧时间（毫秒）
+以及每秒处理的粒子数。
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import math
+import os
+import time
+
+SCENES = ('claude_heart', 'g_heart', 'dance_heart', '3D_heart', 'claude3_7_heart', 'g_heart_2')
+GL_SCENES = ('claude_heart',)
+
+# 每个场景默认扫描的粒子数
+DEFAULT_COUNTS = {
+    'claude_heart': [2000, 20000],
+    'g_heart': [50, 500],
+    'dance_heart': [2000, 20000],
+    '3D_heart': [3000, 30000],
+    'claude3_7_heart': [900, 9000],
+    'g_heart_2': [200, 2000],
+}
+DEFAULT_SIZES = [(800, 600)]
+FPS = 60
+
+
+class FixedClock:
+    """替换pygame.time.get_ticks，每帧前进固定的1000/FPS毫秒"""
+
+    def __init__(self, fps=FPS):
+        self.fps = fps
+        self.frame = 0
+
+    def get_ticks(self):
+        return int(self.frame * 1000 / self.fps)
+
+    def tick(self):
+        self.frame += 1
+
+
+@contextlib.contextmanager
+def fixed_clock(pygame, clock):
+    real_get_ticks = pygame.time.get_ticks
+    pygame.time.get_ticks = clock.get_ticks
+    try:
+        yield clock
+    finally:
+        pygame.time.get_ticks = real_get_ticks
+
+
+def percentile(sorted_values, q):
+    """最近秩百分位数（输入已排序）"""
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+# 场景适配：setup(module, count, size, options) -> (step, live_count[, present])
+# step() 推进并绘制一帧，live_count() 返回当前活跃粒子数，present() 把这一帧提交到
+# 显示（自己决定提交方式的场景才给出，默认整屏flip）；
+# options是命令行参数，场景按需取用（如 options.sprites）；
+# 以dt推进的场景每帧走 1/options.fps 秒，与FixedClock一致
+
+def setup_claude_heart(module, count, size, options):
+    import pygame
+    from OpenGL.GL import glFinish
+    from frame_random import FrameRandom
+
+    pygame.display.set_mode(size, pygame.DOUBLEBUF | pygame.OPENGL)
+    module.setup_gl(size)
+    particles = module.generate_heart_particles(count, FrameRandom(options.seed))
+
+    def step():
+        module.render_frame(particles, pygame.time.get_ticks() / 1000.0)
+        glFinish()
+
+    return step, lambda: len(particles)
+
+
+def steady_spawn_rate(count, decay):
+    """粒子生命每步减少decay时，让稳定后的存活粒子数约为count的每步生成数"""
+    return count * decay
+
+
+def setup_g_heart(module, count, size, options):
+    # 粒子上限和生成速率都随count变化，稳定后约有count个粒子
+    scene = module.HeartAnimation(*size, sprites=options.sprites, dirty_rects=options.dirty_rects,
+                                  particle_count=count, seed=options.seed,
+                                  spawn_rate=steady_spawn_rate(count, module.PARTICLE_DECAY))
+    # 脏矩形模式只提交变化的区域，由场景自己的present完成
+    return scene.step, lambda: len(scene.particles), scene.present
+
+
+def setup_dance_heart(module, count, size, options):
+    scene = module.BeatingHeart(*size, particle_count=count, sprites=options.sprites,
+                                engine=options.engine, rasterizer=options.rasterizer,
+                                workers=options.workers, repulsion=options.repulsion, seed=options.seed)
+    return scene.step, lambda: scene.particle_count
+
+
+def setup_3d_heart(module, count, size, options):
+    # 3D_heart没有多进程引擎，parallel按numpy数组引擎测
+    engine = options.engine if options.engine in module.ENGINES else 'numpy'
+    scene = module.ParticleHeart(*size, particle_count=count, engine=engine, sprites=options.sprites,
+                                 seed=options.seed)
+
+    def step():
+        scene.update_particles(1 / options.fps)
+        scene.draw()
+
+    return step, lambda: scene.active_count
+
+
+def setup_claude3_7_heart(module, count, size, options):
+    import pygame
+    from frame_random import FrameRandom
+    from sprite_atlas import CircleAtlas, SpriteBatch
+
+    screen = pygame.display.set_mode(size)
+    particle_surface = pygame.Surface(size, pygame.SRCALPHA)
+    rng = FrameRandom(options.seed)
+    particles = module.create_scaled_particles(count, rng)
+    state = {'heartbeat': 0, 'heartbeat_speed': 0.05}
+    batch = SpriteBatch(CircleAtlas()) if options.sprites else None
+
+    def step():
+        state['heartbeat'], state['heartbeat_speed'], intensity = module.advance_heartbeat(
+            state['heartbeat'], state['heartbeat_speed'], 1 / options.fps)
+        module.update_particles(particles, intensity, 1 / options.fps, rng)
+        module.draw_frame(screen, particle_surface, particles, intensity, batch)
+
+    return step, lambda: len(particles)
+
+
+def setup_g_heart_2(module, count, size, options):
+    scene = module.StereoHeart(*size, frame_cache=options.frame_cache, max_particles=count,
+                               spawn_rate=steady_spawn_rate(count, module.PARTICLE_DECAY), seed=options.seed)
+
+    def step():
+        scene.update_animation(1 / options.fps)
+        scene.draw_scene()
+
+    return step, lambda: len(scene.particles) + scene.heart_count
+
+
+SETUPS = {
+    'claude_heart': setup_claude_heart,
+    'g_heart': setup_g_heart,
+    'dance_heart': setup_dance_heart,
+    '3D_heart': setup_3d_heart,
+    'claude3_7_heart': setup_claude3_7_heart,
+    'g_heart_2': setup_g_heart_2,
+}
+
+
+def setup_scene(scene, module, count, size, options):
+    """调用场景适配，返回 (step, live_count, present)"""
+    import pygame
+
+    step, live_count, *present = SETUPS[scene](module, count, size, options)
+    return step, live_count, present[0] if present else pygame.display.flip
+
+
+def run_case(scene, count, size, options):
+    """在独立的显示会话中跑一个组合，返回结果字典"""
+    import pygame
+
+    frames = options.frames
+    module = importlib.import_module(scene)
+    pygame.display.init()
+    pygame.font.init()
+
+    clock = FixedClock(options.fps)
+    with fixed_clock(pygame, clock):
+        step, live_count, present = setup_scene(scene, module, count, size, options)
+        for _ in range(options.warmup):
+            step()
+            present()
+            clock.tick()
+
+        timings = []
+        particles = 0
+        for _ in range(frames):
+            start = time.perf_counter()
+            step()
+            present()
+            timings.append((time.perf_counter() - start) * 1000)
+            particles += live_count()
+            clock.tick()
+
+    # 持有进程/共享内存的场景（dance_heart的parallel引擎）提供close()
+    scene_object = getattr(step, '__self__', None)
+    if hasattr(scene_object, 'close'):
+        scene_object.close()
+    pygame.display.quit()
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    return {
+        'scene': scene,
+        'particles': count,
+        'live_particles': particles / frames,
+        'width': size[0],
+        'height': size[1],
+        'frames': frames,
+        'sprites': options.sprites,
+        'engine': options.engine,
+        'workers': options.workers,
+        'repulsion': options.repulsion,
+        # 未指定时记录场景实际使用的光栅化方式（dance_heart按引擎选默认值）
+        'rasterizer': getattr(scene_object, 'rasterizer', options.rasterizer),
+        'dirty_rects': options.dirty_rects,
+        'frame_cache': options.frame_cache,
+        'mean_ms': round(mean, 4),
+        'p50_ms': round(percentile(timings, 50), 4),
+        'p99_ms': round(percentile(timings, 99), 4),
+        'fps': round(1000 / mean, 2),
+        'particles_per_sec': round(particles / (sum(timings) / 1000), 1),
+    }
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无窗口场景基准测试")
+    parser.add_argument('scenes', nargs='*', metavar='scene',
+                        help=f"要测试的场景（默认全部）：{', '.join(SCENES)}")
+    parser.add_argument('--counts', type=int, nargs='+', help="粒子数列表（默认按场景）")
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=DEFAULT_SIZES,
+                        help="分辨率列表，如 800x600 1920x1080")
+    parser.add_argument('--frames', type=int, default=120, help="计时帧数")
+    parser.add_argument('--warmup', type=int, default=30, help="计时前的预热帧数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fps', type=int, default=FPS, help="固定时钟的帧率（每帧模拟 1/fps 秒）")
+    parser.add_argument('--sprites', action='store_true',
+                        help="粒子使用精灵图集 + Surface.blits批量绘制（claude_heart、g_heart_2不支持）")
+    parser.add_argument('--engine', choices=('python', 'numpy', 'parallel'), default='python',
+                        help="dance_heart的粒子引擎；3D_heart用python或numpy（parallel按numpy）")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="parallel引擎的工作进程数（默认每个CPU一个）")
+    parser.add_argument('--repulsion', action='store_true',
+                        help="dance_heart开启粒子间斥力（需要numpy或parallel引擎）")
+    parser.add_argument('--rasterizer', choices=('circles', 'splat'), default=None,
+                        help="dance_heart的光栅化方式（默认同场景：python引擎circles，numpy/parallel引擎splat）")
+    parser.add_argument('--dirty-rects', action='store_true', help="g_heart只重绘并提交变化的区域")
+    parser.add_argument('--frame-cache', action='store_true',
+                        help="g_heart_2缓存一个周期的静态心形层（临时文件），预热帧数应覆盖一个周期")
+    parser.add_argument('--output', help="把全部结果写成JSON数组到该文件")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenes) - set(SCENES)
+    if unknown:
+        parser.error(f"未知场景: {', '.join(sorted(unknown))}")
+
+    # PyOpenGL在首次导入时选择平台，offscreen驱动的上下文来自EGL
+    os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+
+    results = []
+    for scene in args.scenes or SCENES:
+        # SDL在每次pygame.display.init()时读取驱动名；dummy驱动不支持OpenGL
+        os.environ['SDL_VIDEODRIVER'] = 'offscreen' if scene in GL_SCENES else 'dummy'
+
+        for count in args.counts or DEFAULT_COUNTS[scene]:
+            for size in args.sizes:
+                result = run_case(scene, count, size, args)
+                results.append(result)
+                print(json.dumps(result, ensure_ascii=False), flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
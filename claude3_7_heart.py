@@ -1,15 +1,19 @@
+import argparse
 import pygame
 import math
-import random
 import sys
+from functools import lru_cache
 
-# 初始化pygame
-pygame.init()
+import numpy as np
+
+from frame_clock import FixedTimestep, frames, lerp
+from frame_profiler import FrameProfiler, add_profiler_arguments, profiler_from_args
+from frame_random import FrameRandom, add_random_arguments
+from heart_geometry import heart_curve, heart_outline
+from sprite_atlas import CircleAtlas, SpriteBatch
 
 # 屏幕设置
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("跳动的爱心")
 
 # 颜色
 BACKGROUND = (0, 0, 0)  # 黑色背景
@@ -22,186 +26,240 @@ HEART_SIZE = 8  # 心形基础大小
 HEART_X = WIDTH // 2  # 心形X坐标（屏幕中心）
 HEART_Y = HEIGHT // 2  # 心形Y坐标（屏幕中心）
 
-
-# 粒子类
-class Particle:
-    def __init__(self, x, y, color=(255, 105, 180)):
-        self.x = x
-        self.y = y
-        self.original_x = x
-        self.original_y = y
-        self.size = random.uniform(2, 4)
-        self.color = color
-        self.speed_x = random.uniform(-0.5, 0.5)
-        self.speed_y = random.uniform(-0.5, 0.5)
-        self.life = 255  # 粒子透明度/生命值
-        self.max_distance = random.uniform(5, 15)  # 粒子最大漂移距离
-
-    def update(self, heartbeat_intensity):
-        # 计算与原始位置的距离
-        dx = self.x - self.original_x
-        dy = self.y - self.original_y
-        distance = math.sqrt(dx * dx + dy * dy)
-
-        # 如果距离太远，增加向原点的引力
-        if distance > self.max_distance:
-            self.speed_x -= dx * 0.01
-            self.speed_y -= dy * 0.01
-
-        # 更新位置
-        self.x += self.speed_x
-        self.y += self.speed_y
-
-        # 添加随机抖动
-        self.x += random.uniform(-0.5, 0.5)
-        self.y += random.uniform(-0.5, 0.5)
+# 未指定随机源时共用的随机源（不固定种子）
+DEFAULT_RANDOM = FrameRandom()
+
+
+# 粒子存储：每个属性一个数组（结构化数组存储，没有逐粒子对象）
+class ParticleStore:
+    """所有粒子的状态和逐粒子常量
+
+    坐标类属性是 (N, 2) float32：pos / prev（上一模拟步，渲染插值用）/ origin /
+    speed，以及从心形中心指向原始位置的单位向量direction（心跳时沿它向外扩散）。
+    max_distance（最大漂移距离）、size（绘制半径，整数）、colors 在创建时定好。
+    每个粒子约48字节。
+    """
+
+    def __init__(self, origin, colors, rng=DEFAULT_RANDOM):
+        n = len(origin)
+        self.origin = np.asarray(origin, dtype=np.float32)
+        self.pos = self.origin.copy()
+        self.prev = self.origin.copy()
+        self.colors = np.asarray(colors, dtype=np.uint8)
+        # 大小、初速度、最大漂移距离
+        self.size = rng.uniform(2, 4, n).astype(np.uint8)
+        self.speed = rng.uniform(-0.5, 0.5, (n, 2)).astype(np.float32)
+        self.max_distance = rng.uniform(5, 15, n).astype(np.float32)
+
+        # 心跳扩散方向是常量：(原始位置 - 心形中心) 归一化，恰好在中心的粒子不动
+        direction = self.origin - np.array([HEART_X, HEART_Y], dtype=np.float32)
+        length = np.hypot(direction[:, 0], direction[:, 1])[:, None]
+        self.direction = np.divide(direction, length, out=np.zeros_like(direction), where=length > 0)
+
+    def __len__(self):
+        return len(self.pos)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.origin, self.pos, self.prev, self.colors, self.size,
+                                      self.speed, self.max_distance, self.direction))
+
+    def update(self, heartbeat_intensity, k=1.0, jitter=None):
+        """推进一步；k：本步相当于多少个1/60秒帧；jitter：(N, 2) 本步的随机抖动（[-0.5, 0.5)）"""
+        pos, speed = self.pos, self.speed
+        self.prev[:] = pos
+
+        # 距离原始位置太远的粒子，增加向原点的引力
+        offset = pos - self.origin
+        far = np.hypot(offset[:, 0], offset[:, 1]) > self.max_distance
+        speed[far] -= offset[far] * (0.01 * k)
+
+        # 更新位置，加上随机抖动
+        pos += speed * k
+        if jitter is not None:
+            pos += jitter * k
 
         # 心跳时的位置调整 (向外扩散)
         if heartbeat_intensity > 0:
-            direction_x = self.original_x - HEART_X
-            direction_y = self.original_y - HEART_Y
-            length = math.sqrt(direction_x ** 2 + direction_y ** 2)
-            if length > 0:
-                self.x += direction_x / length * heartbeat_intensity
-                self.y += direction_y / length * heartbeat_intensity
+            pos += self.direction * (heartbeat_intensity * k)
+
+    def draw(self, surface, alpha=255, batch=None, t=1.0):
+        """t：渲染插值系数（0: 上一模拟步, 1: 当前步）；给定batch时只排队精灵，由调用方统一blits"""
+        pos = self.pos if t >= 1.0 else self.prev + (self.pos - self.prev) * t
+        if batch is not None:
+            for (x, y), size, color in zip(pos.tolist(), self.size.tolist(), self.colors.tolist()):
+                batch.add(x, y, size, color, alpha)
+            return
+        # 按int()截断取整
+        centers = pos.astype(np.int64).tolist()
+        circle = pygame.draw.circle
+        for center, size, (r, g, b) in zip(centers, self.size.tolist(), self.colors.tolist()):
+            circle(surface, (r, g, b, alpha), center, size)
+
+
+# 从心形轮廓和内部填充创建粒子
+def create_particles(outline_points=200, per_point=2, fill_count=500, rng=DEFAULT_RANDOM):
+    # 心形轮廓点（共享缓存，已按HEART_SIZE缩放），定位并反转Y轴使心形正立
+    outline = heart_outline('classic', outline_points, HEART_SIZE) * (1, -1) + (HEART_X, HEART_Y)
+
+    # 每个轮廓点在附近随机位置生成per_point个粒子，随机颜色（粉红色到红色的渐变）
+    edge = np.repeat(outline, per_point, axis=0)
+    edge += rng.uniform(-2, 2, edge.shape)
+    edge_colors = rng.integers((220, 20, 100), (256, 106, 181), (len(edge), 3))
+
+    # 在内部填充更多粒子：参数方程乘以随机半径系数（确保在内部）
+    t = rng.uniform(0, 2 * math.pi, fill_count)
+    r = rng.uniform(0, 0.8, fill_count)
+    x, y = heart_curve(t, 'classic')
+    fill = np.column_stack((x * HEART_SIZE * r + HEART_X, -y * HEART_SIZE * r + HEART_Y))
+    # 随机颜色（内部粒子更亮）
+    fill_colors = rng.integers((230, 40, 120), (256, 121, 201), (fill_count, 3))
+
+    return ParticleStore(np.concatenate((edge, fill)), np.concatenate((edge_colors, fill_colors)), rng)
+
+
+def create_scaled_particles(count, rng=DEFAULT_RANDOM):
+    """约count个粒子：默认布局（200个轮廓点×2 + 500个填充粒子）按比例缩放"""
+    scale = count / 900
+    return create_particles(max(1, int(200 * scale)), 2, int(500 * scale), rng)
+
+
+# 心跳参数
+MAX_HEARTBEAT_INTENSITY = 5
+
 
-    def draw(self, surface, alpha=255):
-        # 计算当前颜色（带透明度）
-        color = (*self.color, alpha)
-        # 绘制粒子
-        pygame.draw.circle(surface, color, (int(self.x), int(self.y)), int(self.size))
+def advance_heartbeat(heartbeat, heartbeat_speed, dt=1 / 60):
+    """推进心跳相位dt秒，返回 (heartbeat, heartbeat_speed, heartbeat_intensity)
 
+    heartbeat_speed是每1/60秒的相位增量。
+    """
+    step = heartbeat_speed * frames(dt)
+    heartbeat += step
+    heartbeat_intensity = MAX_HEARTBEAT_INTENSITY * abs(math.sin(heartbeat)) ** 2
 
-# 生成心形点集
-def generate_heart_points(num_points, size, x, y):
-    points = []
-    for i in range(num_points):
-        # 参数t从0到2π
-        t = 2 * math.pi * i / num_points
+    # 调整心跳模式（收缩和扩张的不对称模式，更像真实心脏）
+    if math.sin(heartbeat) > 0 and math.sin(heartbeat - step) <= 0:
+        # 心脏收缩开始 - 快速收缩
+        heartbeat_speed = 0.1
+    elif math.sin(heartbeat) < 0 and math.sin(heartbeat - step) >= 0:
+        # 心脏扩张开始 - 慢速扩张
+        heartbeat_speed = 0.03
 
-        # 参数方程（更明确的心形）
-        x_point = 16 * math.sin(t) ** 3
-        y_point = 13 * math.cos(t) - 5 * math.cos(2 * t) - 2 * math.cos(3 * t) - math.cos(4 * t)
+    return heartbeat, heartbeat_speed, heartbeat_intensity
 
-        # 缩放和定位
-        x_point = x_point * size + x
-        y_point = -y_point * size + y  # 反转Y轴使心形正立
 
-        points.append((x_point, y_point))
+@lru_cache(maxsize=32)
+def glow_sprite(glow_intensity, glow_radius):
+    """按(透明度, 半径)缓存的裁剪发光精灵，圆心在(glow_radius + 1, glow_radius + 1)"""
+    size = 2 * glow_radius + 2
+    glow_surf = pygame.Surface((size, size), pygame.SRCALPHA)
+    glow_color = (255, 100, 150, glow_intensity)
+    pygame.draw.circle(glow_surf, glow_color, (glow_radius + 1, glow_radius + 1), glow_radius)
+    return glow_surf
 
-    return points
+
+def update_particles(particles, heartbeat_intensity, dt=1 / 60, rng=DEFAULT_RANDOM):
+    """推进所有粒子dt秒；所有粒子这一步的随机抖动从rng一次取出"""
+    particles.update(heartbeat_intensity, frames(dt), rng.uniform(-0.5, 0.5, (len(particles), 2)))
+
+
+def draw_frame(target, particle_surface, particles, heartbeat_intensity, batch=None, t=1.0):
+    """绘制一帧到target（不刷新显示）；batch为SpriteBatch时粒子批量blit，t为渲染插值系数"""
+    max_heartbeat_intensity = MAX_HEARTBEAT_INTENSITY
+
+    # 清屏
+    target.fill(BACKGROUND)
+    particle_surface.fill((0, 0, 0, 0))  # 透明背景
+
+    # 绘制所有粒子：根据心跳状态调整透明度，绘制到透明表面
+    alpha = 200 + 55 * heartbeat_intensity / max_heartbeat_intensity
+    particles.draw(particle_surface, min(255, alpha), batch, t)
+    if batch is not None:
+        batch.flush(particle_surface)
+
+    # 添加发光效果
+    if heartbeat_intensity > max_heartbeat_intensity * 0.7:
+        # 在高强度心跳时添加额外的发光效果；精灵按量化后的强度缓存，
+        # 只在发光圆的包围盒内做叠加混合（透明像素叠加为0，结果与全屏混合相同）
+        glow_intensity = int(80 * (heartbeat_intensity / max_heartbeat_intensity))
+        glow_radius = int(100 + 30 * heartbeat_intensity / max_heartbeat_intensity)
+        glow_surf = glow_sprite(glow_intensity, glow_radius)
+        target.blit(glow_surf, (HEART_X - glow_radius - 1, HEART_Y - glow_radius - 1),
+                    special_flags=pygame.BLEND_ADD)
+
+    # 将粒子表面绘制到屏幕上
+    target.blit(particle_surface, (0, 0))
 
 
 # 主函数
-def main():
+def main(sprites=False, sim_hz=60, fps=60, profiler=None, seed=None, particle_count=900):
+    profiler = profiler or FrameProfiler()
+    rng = FrameRandom(seed)
+
+    # 只初始化视频子系统，音频、手柄等用不到
+    pygame.display.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("跳动的爱心")
+
     clock = pygame.time.Clock()
+    sim_clock = FixedTimestep(sim_hz)
+    batch = SpriteBatch(CircleAtlas()) if sprites else None
 
     # 创建表面用于绘制（支持透明度）
     particle_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
 
-    # 生成心形轮廓点
-    heart_points = generate_heart_points(200, HEART_SIZE, HEART_X, HEART_Y)
-
-    # 从轮廓点创建粒子
-    particles = []
-    for point in heart_points:
-        # 为每个轮廓点创建多个粒子
-        for _ in range(2):  # 每个点2个粒子
-            # 在点附近随机位置生成粒子
-            offset_x = random.uniform(-2, 2)
-            offset_y = random.uniform(-2, 2)
-            # 随机颜色（粉红色到红色的渐变）
-            r = random.randint(220, 255)
-            g = random.randint(20, 105)
-            b = random.randint(100, 180)
-            particle = Particle(point[0] + offset_x, point[1] + offset_y, (r, g, b))
-            particles.append(particle)
-
-    # 在内部填充更多粒子
-    for _ in range(500):
-        t = random.uniform(0, 2 * math.pi)
-        # 参数方程
-        r = random.uniform(0, 0.8)  # 随机半径系数（确保在内部）
-        x_point = 16 * math.sin(t) ** 3
-        y_point = 13 * math.cos(t) - 5 * math.cos(2 * t) - 2 * math.cos(3 * t) - math.cos(4 * t)
-
-        # 缩放和定位
-        x_point = x_point * HEART_SIZE * r + HEART_X
-        y_point = -y_point * HEART_SIZE * r + HEART_Y
-
-        # 随机颜色（内部粒子更亮）
-        r = random.randint(230, 255)
-        g = random.randint(40, 120)
-        b = random.randint(120, 200)
-
-        particle = Particle(x_point, y_point, (r, g, b))
-        particles.append(particle)
+    particles = create_scaled_particles(particle_count, rng)
 
     # 心跳参数
     heartbeat = 0
     heartbeat_speed = 0.05
-    max_heartbeat_intensity = 5
+    heartbeat_intensity = prev_intensity = 0
 
     running = True
     while running:
+        profiler.begin_frame()
         for event in pygame.event.get():
+            if profiler.handle_event(event):
+                continue
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
+        profiler.lap('event')
+
+        # 按固定步长更新心跳和粒子
+        for _ in range(sim_clock.advance()):
+            prev_intensity = heartbeat_intensity
+            heartbeat, heartbeat_speed, heartbeat_intensity = advance_heartbeat(
+                heartbeat, heartbeat_speed, sim_clock.dt)
+            update_particles(particles, heartbeat_intensity, sim_clock.dt, rng)
+        profiler.lap('update')
+
+        t = sim_clock.alpha
+        draw_frame(screen, particle_surface, particles, lerp(prev_intensity, heartbeat_intensity, t), batch, t)
 
-        # 更新心跳
-        heartbeat += heartbeat_speed
-        heartbeat_intensity = max_heartbeat_intensity * abs(math.sin(heartbeat)) ** 2
-
-        # 调整心跳模式（收缩和扩张的不对称模式，更像真实心脏）
-        if math.sin(heartbeat) > 0 and math.sin(heartbeat - heartbeat_speed) <= 0:
-            # 心脏收缩开始 - 快速收缩
-            heartbeat_speed = 0.1
-        elif math.sin(heartbeat) < 0 and math.sin(heartbeat - heartbeat_speed) >= 0:
-            # 心脏扩张开始 - 慢速扩张
-            heartbeat_speed = 0.03
-
-        # 清屏
-        screen.fill(BACKGROUND)
-        particle_surface.fill((0, 0, 0, 0))  # 透明背景
-
-        # 更新和绘制所有粒子
-        for particle in particles:
-            particle.update(heartbeat_intensity)
-            # 根据心跳状态调整粒子大小和透明度
-            size_mult = 1 + 0.3 * heartbeat_intensity / max_heartbeat_intensity
-            alpha = 200 + 55 * heartbeat_intensity / max_heartbeat_intensity
-            # 绘制到透明表面
-            particle.draw(particle_surface, min(255, alpha))
-
-        # 添加发光效果
-        if heartbeat_intensity > max_heartbeat_intensity * 0.7:
-            # 在高强度心跳时添加额外的发光效果
-            glow_surf = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            glow_intensity = int(80 * (heartbeat_intensity / max_heartbeat_intensity))
-            glow_color = (255, 100, 150, glow_intensity)
-            glow_radius = int(100 + 30 * heartbeat_intensity / max_heartbeat_intensity)
-            pygame.draw.circle(glow_surf, glow_color, (HEART_X, HEART_Y), glow_radius)
-            screen.blit(glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
-
-        # 将粒子表面绘制到屏幕上
-        screen.blit(particle_surface, (0, 0))
-
-        # 显示帧率（调试用）
-        # fps = str(int(clock.get_fps()))
-        # font = pygame.font.SysFont('Arial', 20)
-        # fps_text = font.render(fps, True, WHITE)
-        # screen.blit(fps_text, (10, 10))
+        # 分阶段计时叠加层（F3切换）
+        profiler.draw_overlay(screen)
+        profiler.lap('draw')
 
         # 更新屏幕
         pygame.display.flip()
-        clock.tick(60)
+        profiler.lap('flip')
+        clock.tick(fps)
+        profiler.end_frame()
 
+    profiler.close()
     pygame.quit()
     sys.exit()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="跳动的爱心")
+    parser.add_argument('--sprites', action='store_true', help="粒子使用精灵图集批量绘制")
+    parser.add_argument('--sim-hz', type=float, default=60, help="心跳和粒子的模拟频率")
+    parser.add_argument('--fps', type=int, default=60, help="渲染帧率上限（0为不限）")
+    parser.add_argument('--particles', type=int, default=900, help="粒子数量（按默认布局等比例缩放）")
+    add_profiler_arguments(parser)
+    add_random_arguments(parser)
+    args = parser.parse_args()
+    main(args.sprites, args.sim_hz, args.fps, profiler_from_args(args), args.seed, args.particles)
\ No newline at end of file
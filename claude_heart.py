@@ -1,26 +1,37 @@
+import argparse
+import ctypes
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
+from OpenGL.GL.shaders import compileProgram, compileShader
 import numpy as np
 import math
-import random
+from itertools import islice
+
+from frame_profiler import FrameProfiler, add_profiler_arguments, profiler_from_args
+from frame_random import FrameRandom, add_random_arguments
+from heart_geometry import heart_curve
+from quality_governor import add_governor_arguments, governor_from_args
+
+
+# 未指定随机源时共用的随机源（不固定种子）
+DEFAULT_RANDOM = FrameRandom()
+
+# 柔和的粉色系颜色：RGBA各分量的取值范围
+COLOR_LOW = (0.8, 0.3, 0.4, 0.6)
+COLOR_HIGH = (1.0, 0.6, 0.7, 0.9)
 
 
 class HeartParticle:
-    def __init__(self, x, y, z, color=None):
+    def __init__(self, x, y, z, color=None, size=None, rng=DEFAULT_RANDOM):
         self.original_pos = np.array([x, y, z])
         self.position = np.array([x, y, z])
-        self.size = random.uniform(1.5, 3.0)
+        self.size = rng.uniform(1.5, 3.0) if size is None else size
 
         # 柔和的粉色系颜色
         if color is None:
-            self.color = (
-                random.uniform(0.8, 1.0),  # R
-                random.uniform(0.3, 0.6),  # G
-                random.uniform(0.4, 0.7),  # B
-                random.uniform(0.6, 0.9)  # Alpha
-            )
+            self.color = tuple(rng.uniform(COLOR_LOW, COLOR_HIGH, 4).tolist())
         else:
             self.color = color
 
@@ -37,85 +48,298 @@ class HeartParticle:
         glEnd()
 
 
-def generate_heart_particles(num_particles=2000):
-    particles = []
+class ParticleBuffer:
+    """一次性上传到显存的粒子云，用glDrawArrays批量绘制
 
-    for _ in range(num_particles):
-        # 复杂的心形参数方程
-        u = random.uniform(0, 2 * np.pi)
+    位置和颜色交错存放在一个顶点缓冲对象（VBO）里；不支持VBO时退回客户端顶点数组。
+    固定管线的glPointSize不能逐顶点设置，因此按光栅化后的整数点大小分组，
+    每组一次glDrawArrays。呼吸偏移对所有粒子相同，绘制时用glTranslatef施加，
+    数据本身从不修改。
+    """
 
-        # 创建更精确的3D心形
-        x = 16 * np.sin(u) ** 3 / 15
-        y = (13 * np.cos(u) - 5 * np.cos(2 * u) - 2 * np.cos(3 * u) - np.cos(4 * u)) / 15
-        z = np.sin(u) * np.cos(u) / 15
+    STRIDE = 7 * 4  # x, y, z, r, g, b, a (float32)
 
-        # 随机轻微偏移，增加自然感
-        x += random.uniform(-0.05, 0.05)
-        y += random.uniform(-0.05, 0.05)
-        z += random.uniform(-0.05, 0.05)
+    def __init__(self, particles, use_vbo=True):
+        # 非抗锯齿点的大小会四舍五入到整数像素，按该整数排序分组
+        raster_sizes = np.array([max(1, int(round(p.size))) for p in particles])
+        order = np.argsort(raster_sizes, kind='stable')
 
-        particles.append(HeartParticle(x, y, z))
+        data = np.empty((len(particles), 7), dtype=np.float32)
+        data[:, :3] = [particles[i].original_pos for i in order]
+        data[:, 3:] = [particles[i].color for i in order]
+        self.data = np.ascontiguousarray(data)
 
-    return particles
+        sizes, starts, counts = np.unique(raster_sizes[order], return_index=True, return_counts=True)
+        self.batches = list(zip(sizes.tolist(), starts.tolist(), counts.tolist()))
 
+        self.vbo = None
+        if use_vbo and bool(glGenBuffers):
+            self.vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glBufferData(GL_ARRAY_BUFFER, self.data.nbytes, self.data, GL_STATIC_DRAW)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
 
-def main():
-    pygame.init()
-    display = (300, 200)
-    pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
-    pygame.display.set_caption("💗 粒子爱心 💗")
+    def draw(self, time, quality=1.0):
+        """quality < 1 时每个点大小分组只画前一部分（粒子顺序随机，相当于均匀抽样）"""
+        # 微小的呼吸效果（与HeartParticle.update相同的偏移）
+        offset = 0.05 * math.sin(time * 3)
+        glPushMatrix()
+        glTranslatef(0, offset, offset)
 
-    # OpenGL初始化
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        if self.vbo is not None:
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            base = 0
+        else:
+            # 客户端数组：直接指向self.data的内存，避免PyOpenGL临时拷贝
+            base = self.data.ctypes.data
+        glVertexPointer(3, GL_FLOAT, self.STRIDE, ctypes.c_void_p(base))
+        glColorPointer(4, GL_FLOAT, self.STRIDE, ctypes.c_void_p(base + 12))
+
+        for size, start, count in self.batches:
+            count = int(count * quality)
+            if count:
+                glPointSize(size)
+                glDrawArrays(GL_POINTS, start, count)
+
+        if self.vbo is not None:
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glPopMatrix()
+
+    def delete(self):
+        if self.vbo is not None:
+            glDeleteBuffers(1, [self.vbo])
+            self.vbo = None
+
+
+# 顶点着色器：呼吸、心跳缩放、绕Y轴旋转和点大小全部由u_time驱动，
+# 与render_frame中的glRotatef/glScalef及HeartParticle.update的偏移一致
+HEART_VERTEX_SHADER = """
+#version 120
+uniform float u_time;
+attribute float a_size;
+
+void main() {
+    float offset = 0.05 * sin(u_time * 3.0);
+    vec3 p = gl_Vertex.xyz + vec3(0.0, offset, offset);
+
+    float scale = 1.0 + 0.1 * sin(u_time * 3.0);
+    float angle = radians(u_time * 20.0);
+    float c = cos(angle);
+    float s = sin(angle);
+    p = vec3(c * p.x + s * p.z, p.y, -s * p.x + c * p.z) * scale;
+
+    gl_Position = gl_ModelViewProjectionMatrix * vec4(p, 1.0);
+    gl_FrontColor = gl_Color;
+    gl_PointSize = a_size;
+}
+"""
+
+HEART_FRAGMENT_SHADER = """
+#version 120
+
+void main() {
+    gl_FragColor = gl_Color;
+}
+"""
+
+
+class ShaderParticleCloud:
+    """完全静态的显存粒子云，所有随时间变化的运动都在着色器里完成
+
+    每帧CPU只设置一个uniform并调用一次glDrawArrays，开销与粒子数量无关。
+    """
+
+    STRIDE = 8 * 4  # x, y, z, r, g, b, a, size (float32)
+
+    def __init__(self, positions, colors, sizes):
+        data = np.empty((len(positions), 8), dtype=np.float32)
+        data[:, :3] = positions
+        data[:, 3:7] = colors
+        data[:, 7] = sizes
+        self.count = len(data)
+
+        self.program = compileProgram(
+            compileShader(HEART_VERTEX_SHADER, GL_VERTEX_SHADER),
+            compileShader(HEART_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        )
+        self.time_location = glGetUniformLocation(self.program, 'u_time')
+        self.size_location = glGetAttribLocation(self.program, 'a_size')
+
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self, time, quality=1.0):
+        glUseProgram(self.program)
+        glUniform1f(self.time_location, time)
+        glEnable(GL_VERTEX_PROGRAM_POINT_SIZE)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glEnableVertexAttribArray(self.size_location)
+        glVertexPointer(3, GL_FLOAT, self.STRIDE, ctypes.c_void_p(0))
+        glColorPointer(4, GL_FLOAT, self.STRIDE, ctypes.c_void_p(12))
+        glVertexAttribPointer(self.size_location, 1, GL_FLOAT, GL_FALSE, self.STRIDE, ctypes.c_void_p(28))
+
+        glDrawArrays(GL_POINTS, 0, max(1, int(self.count * quality)))
+
+        glDisableVertexAttribArray(self.size_location)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisable(GL_VERTEX_PROGRAM_POINT_SIZE)
+        glUseProgram(0)
+
+    def delete(self):
+        if self.vbo is not None:
+            glDeleteBuffers(1, [self.vbo])
+            glDeleteProgram(self.program)
+            self.vbo = None
+
+
+def generate_heart_arrays(num_particles=2000, rng=DEFAULT_RANDOM):
+    """心形粒子云的 (positions, colors, sizes) 数组，所有随机量整批取出（百万级粒子用）"""
+    u = rng.uniform(0, 2 * np.pi, num_particles)
+
+    # 复杂的心形参数方程，创建更精确的3D心形
+    positions = np.empty((num_particles, 3))
+    x, y = heart_curve(u)
+    positions[:, 0] = x / 15
+    positions[:, 1] = y / 15
+    positions[:, 2] = np.sin(u) * np.cos(u) / 15
+    # 随机轻微偏移，增加自然感
+    positions += rng.uniform(-0.05, 0.05, (num_particles, 3))
+
+    # 柔和的粉色系颜色
+    colors = rng.uniform(COLOR_LOW, COLOR_HIGH, (num_particles, 4))
+    sizes = rng.uniform(1.5, 3.0, num_particles)
+    return positions, colors, sizes
+
+
+def generate_heart_particles(num_particles=2000, rng=DEFAULT_RANDOM):
+    """逐粒子对象的心形（立即模式和缓冲模式用），数据与generate_heart_arrays相同"""
+    positions, colors, sizes = generate_heart_arrays(num_particles, rng)
+    return [HeartParticle(*pos, color=tuple(color), size=size)
+            for pos, color, size in zip(positions.tolist(), colors.tolist(), sizes.tolist())]
+
+
+RENDER_MODES = ('immediate', 'buffered', 'shader')
+
+
+def setup_gl(display):
+    """OpenGL初始化与透视设置"""
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_BLEND)
     glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
     # 透视设置
     glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
     gluPerspective(45, (display[0] / display[1]), 0.1, 50.0)
     glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glTranslatef(0, 0, -3)
+
+
+def render_frame(particles, current_time, buffer=None, quality=1.0):
+    """绘制一帧；给定buffer时走缓冲批量路径（或着色器路径），否则逐粒子立即模式
+
+    quality（0..1）为自适应画质：只绘制这一比例的粒子，缓冲区内容不变。
+    """
+    # 清屏
+    glClearColor(0.1, 0.1, 0.2, 1)
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    glLoadIdentity()
     glTranslatef(0, 0, -3)
 
-    # 生成粒子
-    particles = generate_heart_particles()
+    # 着色器自己完成旋转、心跳和呼吸
+    if isinstance(buffer, ShaderParticleCloud):
+        buffer.draw(current_time, quality)
+        return
+
+    # 旋转
+    glRotatef(current_time * 20, 0, 1, 0)
+
+    # 心跳缩放
+    scale = 1 + 0.1 * math.sin(current_time * 3)
+    glScalef(scale, scale, scale)
+
+    # 更新和绘制粒子
+    if buffer is not None:
+        buffer.draw(current_time, quality)
+        return
+
+    for particle in islice(particles, max(1, int(len(particles) * quality))):
+        particle.update(current_time)
+        particle.draw()
+
+
+def main(render_mode='immediate', num_particles=2000, profiler=None, governor=None, seed=None):
+    # OpenGL窗口上不能blit叠加层，这里只记录分阶段计时（--trace）
+    profiler = profiler or FrameProfiler()
+    pygame.display.init()  # 只初始化视频子系统
+    display = (300, 200)
+    pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
+    pygame.display.set_caption("💗 粒子爱心 💗")
+
+    # OpenGL初始化
+    setup_gl(display)
+
+    # 生成粒子（固定seed时粒子云逐位复现）
+    rng = FrameRandom(seed)
+    if render_mode == 'shader':
+        particles = []
+        buffer = ShaderParticleCloud(*generate_heart_arrays(num_particles, rng))
+    else:
+        particles = generate_heart_particles(num_particles, rng)
+        buffer = ParticleBuffer(particles) if render_mode == 'buffered' else None
 
     clock = pygame.time.Clock()
     start_time = pygame.time.get_ticks()
 
     while True:
+        profiler.begin_frame()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                profiler.close()
                 pygame.quit()
                 return
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
+                    profiler.close()
                     pygame.quit()
                     return
+        profiler.lap('event')
 
         current_time = (pygame.time.get_ticks() - start_time) / 1000.0
 
-        # 清屏
-        glClearColor(0.1, 0.1, 0.2, 1)
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        glLoadIdentity()
-        glTranslatef(0, 0, -3)
-
-        # 旋转
-        glRotatef(current_time * 20, 0, 1, 0)
-
-        # 心跳缩放
-        scale = 1 + 0.1 * math.sin(current_time * 3)
-        glScalef(scale, scale, scale)
-
-        # 更新和绘制粒子
-        for particle in particles:
-            particle.update(current_time)
-            particle.draw()
+        # 动画完全由时间决定，没有单独的更新阶段
+        render_frame(particles, current_time, buffer, governor.quality if governor else 1.0)
+        profiler.lap('draw')
 
         pygame.display.flip()
+        profiler.lap('flip')
         clock.tick(60)
+        profiler.end_frame()
+        if governor is not None:
+            governor.update(profiler.work_ms)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="OpenGL粒子爱心")
+    parser.add_argument('--render', choices=RENDER_MODES, default='immediate',
+                        help="immediate: 逐粒子glBegin/glEnd; buffered: VBO + glDrawArrays; "
+                             "shader: 静态VBO + GLSL动画")
+    parser.add_argument('--particles', type=int, default=2000, help="粒子数量")
+    add_profiler_arguments(parser)
+    add_governor_arguments(parser)
+    add_random_arguments(parser)
+    args = parser.parse_args()
+    main(args.render, args.particles, profiler_from_args(args), governor_from_args(args), args.seed)
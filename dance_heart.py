@@ -1,20 +1,46 @@
+import argparse
 import pygame
 import math
-import random
+from itertools import islice
+import numpy as np
 from pygame.locals import *
 
-# Initialize Pygame
-pygame.init()
+from dance_physics import DARK_PINK, LIGHT_PINK, particle_repulsion, step_particles
+from frame_profiler import FrameProfiler, add_profiler_arguments, profiler_from_args
+from frame_random import FrameRandom, add_random_arguments
+from heart_geometry import heart_outline
+from quality_governor import add_governor_arguments, governor_from_args, scaled
+from sprite_atlas import CircleAtlas, SpriteBatch
 
-# Color definitions
-DARK_PINK = (255, 51, 153)
-LIGHT_PINK = (255, 182, 193)
+# Color definitions (DARK_PINK / LIGHT_PINK live in dance_physics)
 WHITE = (255, 255, 255, 100)
+BACKGROUND = (30, 30, 40)
+
+# Full-quality effect levels; the quality governor scales them down under load
+TRAIL_SAMPLES = 3
+HIGHLIGHTS = 50
+
+# The trail buffer grows in steps of this many pixels so a drag-resize reallocates rarely
+TRAIL_GROW_STEP = 256
+
+ENGINES = ('python', 'numpy', 'parallel')
+RASTERIZERS = ('circles', 'splat')
 
 
 class BeatingHeart:
-    def __init__(self, width=800, height=600):
-        # Window setup
+    def __init__(self, width=800, height=600, particle_count=2000, engine='python', sprites=False,
+                 rasterizer=None, workers=None, repulsion=False, seed=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+        if rasterizer is None:
+            # The array engines update in a few vectorized passes; per-particle circles would
+            # make drawing the bottleneck, so they splat into a numpy framebuffer by default
+            rasterizer = 'circles' if engine == 'python' else 'splat'
+        if rasterizer not in RASTERIZERS:
+            raise ValueError(f"Unknown rasterizer {rasterizer!r}, expected one of {RASTERIZERS}")
+
+        # Window setup (video subsystem only; audio, joystick etc. are never used)
+        pygame.display.init()
         self.screen = pygame.display.set_mode((width, height), RESIZABLE)
         self.width, self.height = width, height
         self.clock = pygame.time.Clock()
@@ -24,41 +50,165 @@ class BeatingHeart:
         self.base_scale = 1.0  # Base scale
         self.beat_force = 0.15  # Beat strength
         self.beat_speed = 1.5  # Beat speed
-        self.particle_count = 2000  # Number of particles
+        self.particle_count = particle_count  # Number of particles (allocated once)
+        # Active prefix of the particle set and effect levels, set by apply_quality
+        self.active_count = particle_count
+        self.trail_samples = TRAIL_SAMPLES
+        self.highlight_count = HIGHLIGHTS
+        # 'python': list of dicts, 'numpy': struct-of-arrays,
+        # 'parallel': struct-of-arrays in shared memory, updated by a pool of worker processes
+        self.engine = engine
+        self.workers = workers  # parallel engine only; None = one per CPU
+        # Optional short-range particle-particle repulsion on a spatial hash (array engines)
+        self.repulsion = repulsion
+        if repulsion and engine == 'python':
+            raise ValueError("repulsion requires the 'numpy' or 'parallel' engine")
+        self.parallel = None
+        # Shared seeded source for all per-frame noise; noise is drawn in bulk, one array per frame
+        self.rng = FrameRandom(seed)
+        # Optional: draw particles from a sprite atlas in one blits() batch
+        self.sprite_batch = SpriteBatch(CircleAtlas()) if sprites else None
+        # Optional: accumulate all particles into a numpy framebuffer instead of drawing circles
+        self.rasterizer = rasterizer
+        self.splatter = None
+        if rasterizer == 'splat':
+            from splat_raster import SplatRasterizer
+            self.splatter = SplatRasterizer(width, height)
+
+        # Heart shape points (parametric equation); the python engine indexes the list form
+        self.heart_shape = self.generate_heart_shape()
+        self.heart_points = self.heart_shape.tolist()
 
         # Initialize particle system
         self.particles = []
         self.init_particles()
 
-        # Create semi-transparent surface for trail effect
-        self.trail_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-
-        # Heart shape points (parametric equation)
-        self.heart_shape = self.generate_heart_shape()
+        # Create semi-transparent surface for trail effect; a window-sized view into a
+        # buffer that is only reallocated when the window outgrows it
+        self.trail_buffer = None
+        self.trail_surface = self.trail_view(width, height)
 
     def generate_heart_shape(self, samples=300):
-        """Generate base heart shape"""
-        points = []
-        t = 0
-        while t < 2 * math.pi:
-            x = 16 * (math.sin(t) ** 3)
-            y = 13 * math.cos(t) - 5 * math.cos(2 * t) - 2 * math.cos(3 * t) - math.cos(4 * t)
-            points.append((x, y))
-            t += 2 * math.pi / samples
-        return points
+        """Generate base heart shape (cached, shared read-only array)"""
+        return heart_outline('classic', samples)
 
     def init_particles(self):
         """Initialize particle system"""
+        if self.engine == 'parallel':
+            self.init_parallel_sim()
+            return
+        if self.engine == 'numpy':
+            self.init_particle_arrays()
+            return
+
         self.particles = []
-        for _ in range(self.particle_count):
+        positions = self.rng.uniform((0, 0), (self.width, self.height), (self.particle_count, 2))
+        for pos in positions.tolist():
             self.particles.append({
-                'pos': [random.uniform(0, self.width),
-                        random.uniform(0, self.height)],
+                'pos': pos,
                 'vel': [0, 0],
                 'target': (0, 0),
                 'color': DARK_PINK
             })
 
+    def init_particle_arrays(self):
+        """Initialize struct-of-arrays particle state (numpy engine)"""
+        n = self.particle_count
+        self.pos = self.rng.uniform((0, 0), (self.width, self.height), size=(n, 2))
+        self.vel = np.zeros((n, 2))
+        # Heart point per particle, same i % len(heart_shape) assignment as the python engine
+        shape = self.heart_shape
+        self.target_shape = shape[np.arange(n) % len(shape)]
+        self.colors = np.empty((n, 3), dtype=np.uint8)
+        self.colors[:] = DARK_PINK
+
+    def init_parallel_sim(self):
+        """Initialize shared-memory particle state (parallel engine)
+
+        The worker pool is started once; re-initializing (e.g. after a resize) only scatters the
+        particles again. pos / vel / colors are views of the shared arrays, so the array draw
+        paths read them directly.
+        """
+        if self.parallel is None:
+            # multiprocessing and shared_memory are only loaded when this engine is chosen
+            from parallel_sim import ParallelParticleSim
+
+            n = self.particle_count
+            shape = self.heart_shape
+            self.parallel = ParallelParticleSim(shape[np.arange(n) % len(shape)], self.width, self.height,
+                                                workers=self.workers, seed=self.rng.seed,
+                                                repulsion=self.repulsion)
+        else:
+            self.parallel.reset(self.width, self.height)
+        sim = self.parallel
+        self.pos, self.vel, self.colors, self.target_shape = sim.pos, sim.vel, sim.colors, sim.target_shape
+
+    def close(self):
+        """Release the parallel engine's worker processes and shared memory
+
+        pos / vel / colors / target_shape are views of the shared memory, which is unmapped on
+        close; they are replaced by copies so the last state stays readable.
+        """
+        if self.parallel is not None:
+            self.pos, self.vel, self.colors, self.target_shape = (
+                array.copy() for array in (self.pos, self.vel, self.colors, self.target_shape))
+            self.parallel.close()
+            self.parallel = None
+
+    def apply_quality(self, quality):
+        """Scale active particles, trail samples and highlights by quality (0..1)
+
+        Particles beyond the active prefix keep their state and are simply not updated or
+        drawn, so nothing is reallocated when the governor moves the level.
+        """
+        self.active_count = scaled(self.particle_count, quality, 1)
+        self.trail_samples = scaled(TRAIL_SAMPLES, quality)
+        self.highlight_count = scaled(HIGHLIGHTS, quality)
+        if self.parallel is not None:
+            self.parallel.set_active(self.active_count)
+
+    def active_arrays(self):
+        """Views of the active prefix: pos, vel, colors, target_shape (array engines)"""
+        n = self.active_count
+        return self.pos[:n], self.vel[:n], self.colors[:n], self.target_shape[:n]
+
+    def trail_view(self, width, height):
+        """Trail surface of the given size, reusing the trail buffer when it is large enough"""
+        buffer = self.trail_buffer
+        if buffer is None or buffer.get_width() < width or buffer.get_height() < height:
+            grow = lambda size: -(-size // TRAIL_GROW_STEP) * TRAIL_GROW_STEP
+            capacity = (width, height) if buffer is None else (
+                max(buffer.get_width(), grow(width)), max(buffer.get_height(), grow(height)))
+            buffer = self.trail_buffer = pygame.Surface(capacity, pygame.SRCALPHA)
+        if buffer.get_size() == (width, height):
+            return buffer
+        # The trail is cleared every frame, so nothing has to be copied across
+        return buffer.subsurface((0, 0, width, height))
+
+    def resize(self, width, height):
+        """Adapt to a new window size, keeping the particle state
+
+        The heart is drawn around the window center, so moving every particle by the shift of
+        the center keeps the formation intact; particles now outside the window are clamped.
+        """
+        if (width, height) == (self.width, self.height):
+            return
+        shift_x = width // 2 - self.width // 2
+        shift_y = height // 2 - self.height // 2
+        self.width, self.height = width, height
+
+        if self.engine == 'python':
+            for p in self.particles:
+                p['pos'][0] = min(max(p['pos'][0] + shift_x, 0), width)
+                p['pos'][1] = min(max(p['pos'][1] + shift_y, 0), height)
+        else:
+            self.pos += (shift_x, shift_y)
+            np.clip(self.pos, 0, (width, height), out=self.pos)
+
+        self.trail_surface = self.trail_view(width, height)
+        if self.splatter is not None:
+            self.splatter.resize(width, height)
+
     def calculate_beat(self):
         """Calculate heartbeat curve"""
         time = pygame.time.get_ticks() / 1000
@@ -68,11 +218,22 @@ class BeatingHeart:
 
     def update_particles(self, scale):
         """Update particle states"""
+        if self.engine == 'parallel':
+            # Workers update their slices in place; returns once every slice is done
+            self.parallel.step(scale, self.width, self.height)
+            return
+        if self.engine == 'numpy':
+            self.update_particle_arrays(scale)
+            return
+
         center_x, center_y = self.width // 2, self.height // 2
+        heart_shape = self.heart_points
+        # This frame's perturbation for every active particle, drawn in one call
+        jitter = self.rng.uniform(-0.2, 0.2, (min(self.active_count, len(self.particles)), 2)).tolist()
 
-        for i, p in enumerate(self.particles):
+        for i, p in enumerate(islice(self.particles, self.active_count)):
             # Assign target point from heart shape
-            heart_point = self.heart_shape[i % len(self.heart_shape)]
+            heart_point = heart_shape[i % len(heart_shape)]
             target_x = center_x + heart_point[0] * 10 * scale
             target_y = center_y - heart_point[1] * 10 * scale
 
@@ -91,8 +252,8 @@ class BeatingHeart:
                 p['vel'][1] += dy / distance * speed
 
             # Add random perturbation
-            p['vel'][0] += random.uniform(-0.2, 0.2)
-            p['vel'][1] += random.uniform(-0.2, 0.2)
+            p['vel'][0] += jitter[i][0]
+            p['vel'][1] += jitter[i][1]
 
             # Apply friction
             p['vel'][0] *= friction
@@ -100,7 +261,7 @@ class BeatingHeart:
 
             # Reset if velocity is invalid
             if math.isnan(p['vel'][0]) or math.isnan(p['vel'][1]):
-                p['pos'] = [random.uniform(0, self.width), random.uniform(0, self.height)]
+                p['pos'] = self.rng.uniform((0, 0), (self.width, self.height), 2).tolist()
                 p['vel'] = [0, 0]
             else:
                 # Update position
@@ -109,7 +270,7 @@ class BeatingHeart:
 
             # Reset if position is invalid
             if math.isnan(p['pos'][0]) or math.isnan(p['pos'][1]):
-                p['pos'] = [random.uniform(0, self.width), random.uniform(0, self.height)]
+                p['pos'] = self.rng.uniform((0, 0), (self.width, self.height), 2).tolist()
 
             # Clamp position to screen bounds
             p['pos'][0] = max(0, min(self.width, p['pos'][0]))
@@ -124,22 +285,37 @@ class BeatingHeart:
                 int(DARK_PINK[2] + (LIGHT_PINK[2] - DARK_PINK[2]) * progress)
             )
 
+    def update_particle_arrays(self, scale):
+        """Update particle states as batched array operations (numpy engine)"""
+        pos, vel, colors, target_shape = self.active_arrays()
+        force = particle_repulsion(pos) if self.repulsion else None
+        step_particles(pos, vel, colors, target_shape, scale, self.width, self.height, self.rng, force)
+
     def draw(self, scale):
         """Draw particle heart"""
+        if self.splatter is not None:
+            self.draw_splat()
+            return
+
         # Trail effect
         self.trail_surface.fill((0, 0, 0, 15))  # Semi-transparent black for fading
 
-        for p in self.particles:
+        if self.engine != 'python':
+            self.draw_particle_arrays()
+            return
+
+        particles = self.particles[:self.active_count]
+        for p in particles:
             try:
                 pos = (int(p['pos'][0]), int(p['pos'][1]))
                 if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height:
-                    pygame.draw.circle(self.trail_surface, p['color'], pos, 2)
+                    self.draw_circle(self.trail_surface, p['color'], pos, 2)
             except (TypeError, ValueError, OverflowError) as e:
                 print(f"Error drawing particle: pos={p['pos']}, error={e}")
                 continue
 
             # Draw trail
-            for i in range(1, 4):
+            for i in range(1, self.trail_samples + 1):
                 alpha = 150 // i
                 try:
                     pos = (
@@ -147,50 +323,185 @@ class BeatingHeart:
                         int(p['pos'][1] - p['vel'][1] * i)
                     )
                     if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height:
-                        pygame.draw.circle(self.trail_surface,
-                                           (*p['color'][:3], alpha), pos, max(1, 2 - i // 2))
+                        self.draw_circle(self.trail_surface,
+                                         (*p['color'][:3], alpha), pos, max(1, 2 - i // 2))
                 except (TypeError, ValueError, OverflowError) as e:
                     print(f"Error drawing trail: pos={p['pos']}, vel={p['vel']}, error={e}")
                     continue
 
         # Blit trail surface to screen
+        self.flush_circles(self.trail_surface)
         self.screen.blit(self.trail_surface, (0, 0))
 
-        # Add highlight effect
-        for p in random.sample(self.particles, min(50, len(self.particles))):
+        # Add highlight effect (the screen has no per-pixel alpha, so WHITE's alpha never applied)
+        picks = self.rng.choice(len(particles), min(self.highlight_count, len(particles)), replace=False)
+        for p in map(particles.__getitem__, picks.tolist()):
             try:
                 pos = (int(p['pos'][0]), int(p['pos'][1]))
                 if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height:
-                    pygame.draw.circle(self.screen, WHITE[:3], pos, 2, 0)
-                    pygame.draw.circle(self.screen, WHITE, pos, 4, 1)
+                    self.draw_circle(self.screen, WHITE[:3], pos, 2, 0)
+                    self.draw_circle(self.screen, WHITE[:3], pos, 4, 1)
             except (TypeError, ValueError, OverflowError):
                 continue
+        self.flush_circles(self.screen)
+
+    def particle_arrays(self):
+        """Positions, velocities and colors as arrays, whichever engine is active"""
+        if self.engine != 'python':
+            return self.active_arrays()[:3]
+        particles = self.particles[:self.active_count]
+        return (np.array([p['pos'] for p in particles], dtype=np.float64),
+                np.array([p['vel'] for p in particles], dtype=np.float64),
+                np.array([p['color'] for p in particles], dtype=np.uint8))
+
+    def draw_splat(self):
+        """Splat heads and trail samples into one framebuffer and present it in a single transfer"""
+        pos, vel, colors = self.particle_arrays()
+        splatter = self.splatter
+
+        # Same samples as the circle path: fading trail dots, then the head
+        for i in range(1, self.trail_samples + 1):
+            splatter.splat(pos - vel * i, colors, (150 // i) / 255, max(1, 2 - i // 2))
+        splatter.splat(pos, colors, 1.0, 2)
+        # The trail surface is cleared to black at alpha 15 before being blitted over the background
+        splatter.present(self.screen, BACKGROUND, 15 / 255)
+
+        # Add highlight effect
+        heads = pos.astype(np.int64)
+        picks = self.rng.choice(len(heads), size=min(self.highlight_count, len(heads)), replace=False)
+        for x, y in heads[picks].tolist():
+            if 0 <= x < self.width and 0 <= y < self.height:
+                pygame.draw.circle(self.screen, WHITE[:3], (x, y), 2, 0)
+                pygame.draw.circle(self.screen, WHITE[:3], (x, y), 4, 1)
+
+    def draw_circle(self, surface, color, pos, radius, width=0):
+        """pygame.draw.circle, or queue a sprite when the atlas batch is enabled"""
+        if self.sprite_batch is None:
+            pygame.draw.circle(surface, color, pos, radius, width)
+        else:
+            alpha = color[3] if len(color) > 3 else 255
+            self.sprite_batch.add(pos[0], pos[1], radius, color, alpha, width)
+
+    def flush_circles(self, surface):
+        """Submit queued sprites to surface in one blits() call"""
+        if self.sprite_batch is not None:
+            self.sprite_batch.flush(surface)
+
+    def draw_particle_arrays(self):
+        """Draw particles from the struct-of-arrays state (numpy engine)"""
+        draw_circle = self.draw_circle
+        surface = self.trail_surface
+        w, h = self.width, self.height
+        positions, velocities, colors, _ = self.active_arrays()
+        colors = colors.tolist()
+
+        # Trail samples first, then heads (heads are drawn last within each particle
+        # in the python engine; at 1-2 px the ordering difference is not visible)
+        for i in range(1, self.trail_samples + 1):
+            alpha = 150 // i
+            radius = max(1, 2 - i // 2)
+            trail = (positions - velocities * i).astype(np.int64)
+            visible = (trail[:, 0] >= 0) & (trail[:, 0] < w) & (trail[:, 1] >= 0) & (trail[:, 1] < h)
+            for idx, pos in zip(np.flatnonzero(visible).tolist(), trail[visible].tolist()):
+                draw_circle(surface, (*colors[idx], alpha), pos, radius)
+
+        heads = positions.astype(np.int64)
+        visible = (heads[:, 0] < w) & (heads[:, 1] < h)
+        for idx, pos in zip(np.flatnonzero(visible).tolist(), heads[visible].tolist()):
+            draw_circle(surface, colors[idx], pos, 2)
 
-    def run(self):
-        """Main loop"""
+        # Blit trail surface to screen
+        self.flush_circles(surface)
+        self.screen.blit(surface, (0, 0))
+
+        # Add highlight effect
+        n = len(heads)
+        picks = self.rng.choice(n, size=min(self.highlight_count, n), replace=False)
+        for pos in heads[picks].tolist():
+            if pos[0] < w and pos[1] < h:
+                draw_circle(self.screen, WHITE[:3], pos, 2, 0)
+                draw_circle(self.screen, WHITE[:3], pos, 4, 1)
+        self.flush_circles(self.screen)
+
+    def step(self, profiler=None):
+        """Advance and draw one frame (no event handling, no display flip)"""
+        # Calculate beat scale
+        current_scale = self.calculate_beat()
+
+        # Update and draw
+        self.update_particles(current_scale)
+        if profiler is not None:
+            profiler.lap('update')
+        self.screen.fill(BACKGROUND)  # Dark background
+        self.draw(current_scale)
+
+    def run(self, profiler=None, governor=None):
+        """Main loop; F3 toggles the per-phase timing overlay
+
+        governor: optional QualityGovernor fed with each frame's work time
+        """
+        profiler = profiler or FrameProfiler()
+        try:
+            self.loop(profiler, governor)
+        finally:
+            # Release the parallel engine's workers and shared memory even if a step failed
+            profiler.close()
+            self.close()
+            pygame.quit()
+
+    def loop(self, profiler, governor):
+        """Frames until the window is closed"""
         while self.running:
+            profiler.begin_frame()
+            # A drag-resize floods the queue with VIDEORESIZE events; only the last size matters
+            new_size = None
             for event in pygame.event.get():
+                if profiler.handle_event(event):
+                    continue
                 if event.type == QUIT:
                     self.running = False
                 elif event.type == VIDEORESIZE:
-                    self.width, self.height = event.size
-                    self.screen = pygame.display.set_mode((self.width, self.height), RESIZABLE)
-                    self.trail_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-                    self.init_particles()
+                    new_size = event.size
 
-            # Calculate beat scale
-            current_scale = self.calculate_beat()
+            if new_size is not None and new_size != (self.width, self.height):
+                # pygame 2 resizes the window surface itself; older versions need set_mode
+                self.screen = pygame.display.get_surface()
+                if self.screen.get_size() != new_size:
+                    self.screen = pygame.display.set_mode(new_size, RESIZABLE)
+                self.resize(*new_size)
+            profiler.lap('event')
 
-            # Update and draw
-            self.update_particles(current_scale)
-            self.screen.fill((30, 30, 40))  # Dark background
-            self.draw(current_scale)
+            self.step(profiler)
+            profiler.draw_overlay(self.screen)
+            profiler.lap('draw')
 
             pygame.display.flip()
+            profiler.lap('flip')
             self.clock.tick(60)
-
-        pygame.quit()
+            profiler.end_frame()
+            if governor is not None and governor.update(profiler.work_ms):
+                self.apply_quality(governor.quality)
 
 
 if __name__ == "__main__":
-    BeatingHeart().run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Particle beating heart")
+    parser.add_argument('--engine', choices=ENGINES, default='python',
+                        help="particle engine: per-particle python loop, batched numpy arrays, "
+                             "or numpy arrays in shared memory updated by worker processes")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes for the parallel engine (default: one per CPU)")
+    parser.add_argument('--repulsion', action='store_true',
+                        help="spread particles apart with short-range repulsion (numpy/parallel engines)")
+    parser.add_argument('--particles', type=int, default=2000, help="number of particles")
+    parser.add_argument('--sprites', action='store_true', help="draw particles from a sprite atlas in one blits() batch")
+    parser.add_argument('--rasterizer', choices=RASTERIZERS, default=None,
+                        help="circles: pygame.draw per particle; splat: numpy framebuffer with overdraw aggregation "
+                             "(default: circles for the python engine, splat for numpy/parallel)")
+    add_profiler_arguments(parser)
+    add_governor_arguments(parser)
+    add_random_arguments(parser)
+    args = parser.parse_args()
+    heart = BeatingHeart(particle_count=args.particles, engine=args.engine, sprites=args.sprites,
+                         rasterizer=args.rasterizer, workers=args.workers, repulsion=args.repulsion,
+                         seed=args.seed)
+    heart.run(profiler_from_args(args), governor_from_args(args))
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""dance_heart 粒子的批量更新（numpy 与 parallel 引擎共用）
+
+不依赖pygame，工作进程导入时不会初始化SDL。
+"""
+import numpy as np
+
+from spatial_hash import repulsion_forces
+
+DARK_PINK = (255, 51, 153)
+LIGHT_PINK = (255, 182, 193)
+DARK_PINK_ARR = np.array(DARK_PINK, dtype=np.float64)
+LIGHT_PINK_ARR = np.array(LIGHT_PINK, dtype=np.float64)
+
+# Short-range particle-particle repulsion (px, px/frame at full overlap)
+REPULSION_RADIUS = 4.0
+REPULSION_STRENGTH = 0.25
+
+
+def particle_repulsion(pos, start=0, stop=None):
+    """Neighbor repulsion for particles start:stop against all of pos (spatial hash, ~linear)"""
+    return repulsion_forces(pos, REPULSION_RADIUS, REPULSION_STRENGTH, start=start, stop=stop)
+
+
+def step_particles(pos, vel, colors, target_shape, scale, width, height, rng, force=None):
+    """Advance one frame in place: attraction, jitter, friction, NaN reset, clamp, Y-gradient color
+
+    pos, vel: (N, 2) float64; colors: (N, 3) uint8; target_shape: (N, 2) unscaled heart point per
+    particle. The arrays may be slices of a larger particle set. rng: a FrameRandom (or numpy
+    Generator). force: optional (N, 2) extra acceleration for this frame, e.g. from
+    particle_repulsion.
+    """
+    center_x, center_y = width // 2, height // 2
+    n = len(pos)
+
+    # Target points from heart shape, attraction vector written in place
+    delta = np.multiply(target_shape, 10 * scale)
+    delta[:, 1] *= -1
+    delta += (center_x, center_y)
+    delta -= pos
+    distance = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+
+    # Dynamic motion parameters
+    speed = 0.08 + distance * 0.02
+    friction = 0.92 - distance * 0.002
+
+    # Update velocity, avoiding division by zero
+    np.divide(speed, distance, out=speed, where=distance > 1e-6)
+    speed[distance <= 1e-6] = 0
+    delta *= speed[:, None]
+    vel += delta
+    if force is not None:
+        vel += force
+
+    # Random perturbation and friction
+    vel += rng.uniform(-0.2, 0.2, size=(n, 2))
+    vel *= friction[:, None]
+
+    # Update position; the NaN scan only runs when the cheap sum check trips
+    if np.isnan(vel.sum()):
+        bad_vel = np.isnan(vel).any(axis=1)
+        vel[bad_vel] = 0
+        pos += vel
+        pos[bad_vel] = np.nan
+    else:
+        pos += vel
+
+    # Reset if position is invalid
+    if np.isnan(pos.sum()):
+        bad = np.isnan(pos).any(axis=1)
+        pos[bad] = rng.uniform((0, 0), (width, height), size=(int(bad.sum()), 2))
+
+    # Clamp position to screen bounds
+    np.clip(pos, 0, (width, height), out=pos)
+
+    # Color gradient based on Y position
+    progress = pos[:, 1] - (center_y - 150 * scale)
+    progress /= 300 * scale
+    np.clip(progress, 0, 1, out=progress)
+    # Truncating cast matches int() in the python engine
+    mixed = np.multiply.outer(progress, LIGHT_PINK_ARR - DARK_PINK_ARR)
+    mixed += DARK_PINK_ARR
+    colors[:] = mixed
@@ -0,0 +1,212 @@
+"""离线视频导出：无窗口按固定时间步渲染，后台线程写出PNG序列或Y4M
+
+    python export_video.py dance_heart --frames 600 --output clip.y4m
+    python export_video.py g_heart --frames 300 --format png --output frames/
+    python export_video.py 3D_heart --particles 30000 --size 1920x1080 --fps 30 --output 3d.y4m
+
+场景复用 benchmark.py 的适配函数：时钟固定为每帧 1/fps 秒，随机数固定种子，
+同样的参数总是导出同样的画面。渲染线程每帧只把屏幕像素复制成bytes放进
+有界队列，编码（PNG压缩 / RGB→YUV转换）和写盘在写出线程里完成，与下一帧的
+渲染重叠；队列满时渲染才会等待，所以吞吐由渲染速度决定。
+
+Y4M是未压缩的 YUV 4:4:4 流（BT.601），可以直接交给编码器：
+
+    ffmpeg -i clip.y4m -c:v libx264 -pix_fmt yuv420p clip.mp4
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+import zlib
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+import benchmark
+
+# OpenGL场景的画面不在pygame的屏幕表面上
+SCENES = tuple(scene for scene in benchmark.SCENES if scene not in benchmark.GL_SCENES)
+FORMATS = ('png', 'y4m')
+
+# BT.601 有限范围 RGB -> YCbCr
+YUV_MATRIX = np.array([
+    [0.257, 0.504, 0.098],
+    [-0.148, -0.291, 0.439],
+    [0.439, -0.368, -0.071],
+], dtype=np.float32)
+YUV_OFFSET = np.array([16, 128, 128], dtype=np.float32)
+
+
+class PngSequenceWriter:
+    """每帧一个PNG文件：frame_00000.png, frame_00001.png, ...
+
+    PNG用zlib直接编码（不经过pygame），压缩时释放GIL，不会拖慢渲染线程。
+    """
+
+    def __init__(self, directory, size, fps, level=1):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.width, self.height = size
+        self.level = level
+        self.index = 0
+
+    @staticmethod
+    def _chunk(kind, data):
+        body = kind + data
+        return len(data).to_bytes(4, 'big') + body + zlib.crc32(body).to_bytes(4, 'big')
+
+    def write(self, pixels):
+        w, h = self.width, self.height
+        # 每行前加一个过滤类型字节0（None）
+        rows = np.zeros((h, 1 + w * 3), dtype=np.uint8)
+        rows[:, 1:] = np.frombuffer(pixels, dtype=np.uint8).reshape(h, w * 3)
+        header = w.to_bytes(4, 'big') + h.to_bytes(4, 'big') + bytes((8, 2, 0, 0, 0))
+        png = b''.join((
+            b'\x89PNG\r\n\x1a\n',
+            self._chunk(b'IHDR', header),
+            self._chunk(b'IDAT', zlib.compress(rows.tobytes(), self.level)),
+            self._chunk(b'IEND', b''),
+        ))
+        path = os.path.join(self.directory, f'frame_{self.index:05d}.png')
+        with open(path, 'wb') as f:
+            f.write(png)
+        self.index += 1
+
+    def close(self):
+        pass
+
+
+class Y4mWriter:
+    """未压缩YUV4MPEG2流，4:4:4采样"""
+
+    def __init__(self, path, size, fps):
+        self.width, self.height = size
+        self.file = open(path, 'wb')
+        self.file.write(f'YUV4MPEG2 W{self.width} H{self.height} F{fps}:1 Ip A1:1 C444\n'.encode())
+
+    def write(self, pixels):
+        rgb = np.frombuffer(pixels, dtype=np.uint8).reshape(-1, 3).astype(np.float32)
+        yuv = rgb @ YUV_MATRIX.T
+        yuv += YUV_OFFSET
+        np.clip(yuv, 0, 255, out=yuv)
+        # 平面格式：先整幅Y，再整幅U、V
+        planes = (yuv + 0.5).astype(np.uint8).T
+        self.file.write(b'FRAME\n')
+        self.file.write(np.ascontiguousarray(planes).tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class BackgroundWriter:
+    """有界队列 + 写出线程；put() 在队列满时阻塞，写出线程出错时在渲染线程里重新抛出"""
+
+    def __init__(self, writer, max_queued=8):
+        self.writer = writer
+        self.queue = queue.Queue(max_queued)
+        self.error = None
+        self.blocked = 0.0  # 渲染线程等待队列的总时间（秒）
+        self.thread = threading.Thread(target=self._run, name='frame-writer', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            pixels = self.queue.get()
+            if pixels is None:
+                break
+            if self.error is None:
+                try:
+                    self.writer.write(pixels)
+                except Exception as e:
+                    # 继续取走队列里的帧，渲染线程不会卡在put上
+                    self.error = e
+
+    def put(self, pixels):
+        if self.error is not None:
+            raise self.error
+        start = time.perf_counter()
+        self.queue.put(pixels)
+        self.blocked += time.perf_counter() - start
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.close()
+        if self.error is not None:
+            raise self.error
+
+
+def export(scene, frames, size, count, options, writer, progress=False):
+    """渲染frames帧交给writer，返回 (渲染耗时, 总耗时)，单位秒"""
+    import pygame
+
+    module = benchmark.importlib.import_module(scene)
+    pygame.display.init()
+    pygame.font.init()
+
+    clock = benchmark.FixedClock(options.fps)
+    render_time = 0.0
+    start = time.perf_counter()
+    try:
+        with benchmark.fixed_clock(pygame, clock):
+            # 帧直接从显示表面读取，不需要提交到窗口
+            step, _, _ = benchmark.setup_scene(scene, module, count, size, options)
+            for frame in range(frames):
+                frame_start = time.perf_counter()
+                step()
+                pixels = pygame.image.tobytes(pygame.display.get_surface(), 'RGB')
+                render_time += time.perf_counter() - frame_start
+                writer.put(pixels)
+                clock.tick()
+                if progress and frame % options.fps == 0:
+                    print(f"\r{frame}/{frames}", end='', flush=True)
+        scene_object = getattr(step, '__self__', None)
+        if hasattr(scene_object, 'close'):
+            scene_object.close()
+    finally:
+        writer.close()
+        pygame.display.quit()
+    if progress:
+        print(f"\r{frames}/{frames}")
+    return render_time, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按固定时间步离线导出场景画面")
+    parser.add_argument('scene', choices=SCENES)
+    parser.add_argument('--output', required=True, help="Y4M文件路径，或PNG序列的目录")
+    parser.add_argument('--format', choices=FORMATS, help="默认按output的扩展名判断（.y4m），否则png")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--fps', type=int, default=benchmark.FPS)
+    parser.add_argument('--size', type=benchmark.parse_size, default=benchmark.DEFAULT_SIZES[0],
+                        help="分辨率，如 1920x1080")
+    parser.add_argument('--particles', type=int, help="粒子数（默认同benchmark.py的第一档）")
+    parser.add_argument('--queue', type=int, default=8, help="渲染与写出之间最多排队的帧数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sprites', action='store_true', help="粒子使用精灵图集批量绘制")
+    parser.add_argument('--engine', choices=('python', 'numpy', 'parallel'), default='python',
+                        help="dance_heart的粒子引擎；3D_heart用python或numpy（parallel按numpy）")
+    parser.add_argument('--workers', type=int, default=None, help="parallel引擎的工作进程数")
+    parser.add_argument('--repulsion', action='store_true', help="dance_heart开启粒子间斥力")
+    parser.add_argument('--rasterizer', choices=('circles', 'splat'), default=None,
+                        help="dance_heart的光栅化方式（默认同场景：python引擎circles，numpy/parallel引擎splat）")
+    parser.add_argument('--dirty-rects', action='store_true', help="g_heart只重绘变化的区域（画面相同）")
+    parser.add_argument('--frame-cache', action='store_true', help="g_heart_2回放缓存的静态心形层")
+    args = parser.parse_args(argv)
+
+    kind = args.format or ('y4m' if args.output.lower().endswith('.y4m') else 'png')
+    writer_class = Y4mWriter if kind == 'y4m' else PngSequenceWriter
+    writer = BackgroundWriter(writer_class(args.output, args.size, args.fps), args.queue)
+    count = args.particles or benchmark.DEFAULT_COUNTS[args.scene][0]
+
+    render_time, total_time = export(args.scene, args.frames, args.size, count, args, writer,
+                                     progress=True)
+    print(f"{args.frames} frames -> {args.output} ({kind}) in {total_time:.2f}s: "
+          f"{args.frames / total_time:.1f} fps, render {render_time / args.frames * 1000:.2f} ms/frame, "
+          f"blocked on writer {writer.blocked:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""固定步长模拟时钟 + 渲染插值
+
+模拟按自己的频率（sim_hz）推进，与渲染帧率无关：
+
+    clock = FixedTimestep(sim_hz=30)
+    while running:
+        for _ in range(clock.advance()):
+            scene.update(clock.dt)          # 每步固定 dt 秒
+        scene.draw(clock.alpha)             # 在上一步和当前步之间插值
+
+帧慢了就多补几步（上限 max_steps，避免越补越慢），144 Hz 渲染也不会让动画
+变快；alpha 是累积余量占一步的比例，渲染时用 lerp(上一步, 当前步, alpha)。
+
+各场景原来的动画参数都是“每帧(1/60秒)的增量”，换算为 dt 秒时乘以
+frames(dt) = dt·60 即可。
+"""
+import time
+
+REFERENCE_HZ = 60
+
+
+def frames(dt):
+    """dt秒相当于多少个原始的1/60秒帧"""
+    return dt * REFERENCE_HZ
+
+
+def lerp(a, b, t):
+    return a + (b - a) * t
+
+
+class FixedTimestep:
+    def __init__(self, sim_hz=REFERENCE_HZ, max_steps=5, time_source=time.perf_counter):
+        self.dt = 1 / sim_hz
+        self.max_steps = max_steps
+        self.time_source = time_source
+        self.accumulator = 0.0
+        self.sim_time = 0.0
+        self._last = None
+
+    def advance(self, elapsed=None):
+        """累积经过的真实时间，返回这一帧需要执行的模拟步数
+
+        elapsed为None时读取time_source；离线渲染/基准测试可以直接传入固定值。
+        第一次调用总是执行一步，保证开始渲染前已有状态。
+        """
+        if elapsed is None:
+            now = self.time_source()
+            elapsed = 0.0 if self._last is None else now - self._last
+            self._last = now
+        if self.sim_time == 0.0 and self.accumulator == 0.0:
+            elapsed = max(elapsed, self.dt)
+
+        # 卡顿时最多补 max_steps 步，丢弃多余的时间
+        self.accumulator += min(elapsed, self.max_steps * self.dt)
+        steps = int(self.accumulator / self.dt)
+        self.accumulator -= steps * self.dt
+        self.sim_time += steps * self.dt
+        return steps
+
+    @property
+    def alpha(self):
+        """渲染插值系数：0为上一步状态，1为当前步状态"""
+        return min(1.0, self.accumulator / self.dt)
@@ -0,0 +1,192 @@
+"""逐帧分阶段计时：事件处理、模拟更新、绘制、display.flip 分开统计
+
+    profiler = FrameProfiler(trace_path='trace.csv')
+    while running:
+        profiler.begin_frame()
+        for event in pygame.event.get():
+            profiler.handle_event(event)      # F3 切换叠加层
+            ...
+        profiler.lap('event')
+        update()
+        profiler.lap('update')
+        draw()
+        profiler.draw_overlay(screen)       # 自身耗时单独记为 overlay
+        profiler.lap('draw')
+        pygame.display.flip()
+        profiler.lap('flip')
+        clock.tick(60)
+        profiler.end_frame()                # 剩余时间记为 wait（帧率限制的空等）
+    profiler.close()
+
+lap(phase) 把上一个标记到现在的时间记到 phase 上。每帧一行写入trace：
+扩展名为 .json 时在 close() 时写成JSON数组，否则边运行边写CSV。
+工作时间（wait以外各阶段之和）超过 budget_ms 的帧标记为 over_budget，
+叠加层显示最近一次超时的帧和占用最多的阶段。
+
+叠加层的文字按字符缓存渲染好的字形，每帧只是一次 Surface.blits()。
+"""
+import collections
+import csv
+import json
+import time
+
+import pygame
+
+PHASES = ('event', 'update', 'draw', 'overlay', 'flip', 'wait')
+WORK_PHASES = PHASES[:-1]
+
+TOGGLE_KEY = pygame.K_F3
+OVERLAY_COLOR = (230, 230, 230)
+ALERT_COLOR = (255, 90, 90)
+OVERLAY_BACKGROUND = (0, 0, 0, 160)
+
+
+class GlyphCache:
+    """按 (字符, 颜色) 缓存字形，绘制一行文字只需一次blits"""
+
+    def __init__(self, font):
+        self.font = font
+        self.glyphs = {}
+
+    def glyph(self, char, color):
+        key = (char, color)
+        surface = self.glyphs.get(key)
+        if surface is None:
+            surface = self.glyphs[key] = self.font.render(char, True, color)
+        return surface
+
+    def draw(self, surface, text, pos, color):
+        """逐字符blit，返回这一行的宽度"""
+        x, y = pos
+        items = []
+        for char in text:
+            glyph = self.glyph(char, color)
+            items.append((glyph, (x, y)))
+            x += glyph.get_width()
+        surface.blits(items, doreturn=False)
+        return x - pos[0]
+
+
+class FrameProfiler:
+    def __init__(self, trace_path=None, budget_ms=1000 / 60, overlay=False, window=60):
+        self.budget_ms = budget_ms
+        self.visible = overlay
+        self.frame = 0
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.history = collections.deque(maxlen=window)  # 最近window帧的times
+        self.slowest = None  # 最近一次超时：(帧号, 阶段, 毫秒, 总毫秒)
+        self.work_ms = 0.0  # 上一帧的工作时间（wait以外各阶段之和）
+        self._mark = None
+        self._glyphs = None
+        self._panel = None
+
+        self.trace_path = trace_path
+        self._records = None
+        self._file = self._csv = None
+        if trace_path:
+            if trace_path.lower().endswith('.json'):
+                self._records = []
+            else:
+                self._file = open(trace_path, 'w', newline='', encoding='utf-8')
+                self._csv = csv.writer(self._file)
+                self._csv.writerow(['frame', 'time_s'] + [f'{p}_ms' for p in PHASES]
+                                   + ['work_ms', 'over_budget'])
+        self._start = time.perf_counter()
+
+    def begin_frame(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self._frame_start = self._mark = time.perf_counter()
+
+    def lap(self, phase):
+        """把上一个标记到现在的时间记到phase上"""
+        now = time.perf_counter()
+        self.times[phase] += (now - self._mark) * 1000
+        self._mark = now
+
+    def end_frame(self):
+        self.lap('wait')
+        times = self.times
+        work = self.work_ms = sum(times[p] for p in WORK_PHASES)
+        over = work > self.budget_ms
+        if over:
+            phase = max(WORK_PHASES, key=times.__getitem__)
+            self.slowest = (self.frame, phase, times[phase], work)
+        self.history.append(times)
+
+        if self._csv is not None:
+            self._csv.writerow([self.frame, round(self._frame_start - self._start, 6)]
+                               + [round(times[p], 4) for p in PHASES] + [round(work, 4), int(over)])
+        elif self._records is not None:
+            record = {'frame': self.frame, 'time_s': round(self._frame_start - self._start, 6)}
+            record.update((f'{p}_ms', round(times[p], 4)) for p in PHASES)
+            record.update(work_ms=round(work, 4), over_budget=over)
+            self._records.append(record)
+        self.frame += 1
+
+    def handle_event(self, event):
+        """F3切换叠加层；处理了事件时返回True"""
+        if event.type == pygame.KEYDOWN and event.key == TOGGLE_KEY:
+            self.visible = not self.visible
+            return True
+        return False
+
+    def summary(self):
+        """最近window帧各阶段的平均和最大耗时（毫秒）"""
+        frames = len(self.history) or 1
+        return {p: (sum(t[p] for t in self.history) / frames,
+                    max((t[p] for t in self.history), default=0.0)) for p in PHASES}
+
+    def draw_overlay(self, surface, pos=(8, 8)):
+        """叠加层可见时画到surface上；耗时记为overlay，不计入当前阶段"""
+        if not self.visible:
+            return
+        start = time.perf_counter()
+        if self._glyphs is None:
+            pygame.font.init()
+            self._glyphs = GlyphCache(pygame.font.Font(None, 18))
+
+        stats = self.summary()
+        work = sum(stats[p][0] for p in WORK_PHASES)
+        lines = [(f'frame {self.frame}  work {work:5.2f} ms  budget {self.budget_ms:.1f} ms',
+                  ALERT_COLOR if work > self.budget_ms else OVERLAY_COLOR)]
+        for phase in PHASES:
+            mean, peak = stats[phase]
+            lines.append((f'{phase:<8}{mean:6.2f} avg {peak:6.2f} max', OVERLAY_COLOR))
+        if self.slowest is not None:
+            frame, phase, ms, total = self.slowest
+            lines.append((f'slow #{frame}: {phase} {ms:.1f} of {total:.1f} ms', ALERT_COLOR))
+
+        line_height = self._glyphs.font.get_linesize()
+        size = (300, line_height * len(lines) + 8)
+        if self._panel is None or self._panel.get_size() != size:
+            self._panel = pygame.Surface(size, pygame.SRCALPHA)
+            self._panel.fill(OVERLAY_BACKGROUND)
+        surface.blit(self._panel, pos)
+        x, y = pos[0] + 6, pos[1] + 4
+        for text, color in lines:
+            self._glyphs.draw(surface, text, (x, y), color)
+            y += line_height
+
+        elapsed = time.perf_counter() - start
+        self.times['overlay'] += elapsed * 1000
+        self._mark += elapsed
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = self._csv = None
+        if self._records is not None:
+            with open(self.trace_path, 'w', encoding='utf-8') as f:
+                json.dump(self._records, f)
+            self._records = None
+
+
+def add_profiler_arguments(parser):
+    """给场景的命令行加上 --profile / --trace / --budget-ms"""
+    parser.add_argument('--profile', action='store_true', help="启动时显示分阶段计时叠加层（F3切换）")
+    parser.add_argument('--trace', metavar='PATH', help="逐帧计时写入CSV文件（扩展名.json时写JSON）")
+    parser.add_argument('--budget-ms', type=float, default=1000 / 60, help="帧时间预算（毫秒）")
+
+
+def profiler_from_args(args):
+    return FrameProfiler(args.trace, args.budget_ms, args.profile)
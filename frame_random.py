@@ -0,0 +1,69 @@
+"""共享随机源：每帧的噪声从带种子的 numpy Generator 批量取出，按切片分给粒子
+
+    rand = FrameRandom(seed=0)
+    jitter = rand.uniform(-0.2, 0.2, (n, 2))     # 一次取出n个粒子的抖动
+    for (jx, jy), p in zip(jitter.tolist(), particles):
+        ...
+
+逐粒子调用 random.uniform 的热循环改为每帧取一块数组，Python调用开销从
+每粒子一次变成每帧一次。随机数先成块生成到预分配的缓冲区（block个），
+各处的请求依次切走一段，缓冲区用完再整体重新填充；超过一块的请求直接生成。
+
+同一个种子、同样的调用顺序总是得到同样的序列，场景可以逐位复现。
+seed为None时从系统熵取种子，与原来的 random 模块行为一致。
+"""
+import math
+
+import numpy as np
+
+DEFAULT_BLOCK = 1 << 16
+
+
+class FrameRandom:
+    def __init__(self, seed=None, block=DEFAULT_BLOCK):
+        self.seed = seed
+        self.generator = np.random.default_rng(seed)
+        self.block = block
+        self._buffer = np.empty(0)
+        self._next = 0
+
+    def _take(self, count):
+        """count个[0, 1)均匀分布的数；返回的是缓冲区切片，调用方在下次取数前用完"""
+        if count > self.block:
+            return self.generator.random(count)
+        if self._next + count > len(self._buffer):
+            if len(self._buffer) != self.block:
+                self._buffer = np.empty(self.block)
+            self.generator.random(out=self._buffer)
+            self._next = 0
+        start = self._next
+        self._next += count
+        return self._buffer[start:self._next]
+
+    def random(self, size=None):
+        """[0, 1)均匀分布；size为None时返回float"""
+        if size is None:
+            return float(self._take(1)[0])
+        shape = (size,) if isinstance(size, int) else tuple(size)
+        return self._take(math.prod(shape)).reshape(shape).copy()
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        """[low, high)均匀分布，low/high可以是按最后一维广播的数组（同 Generator.uniform）"""
+        if size is None:
+            return low + (high - low) * float(self._take(1)[0])
+        shape = (size,) if isinstance(size, int) else tuple(size)
+        samples = self._take(math.prod(shape)).reshape(shape)
+        return np.add(low, np.subtract(high, low) * samples)
+
+    def integers(self, low, high, size=None):
+        """[low, high)的整数（不取high，与 random.randint 不同）"""
+        return self.generator.integers(low, high, size)
+
+    def choice(self, n, size=None, replace=True):
+        """从range(n)中抽取下标"""
+        return self.generator.choice(n, size, replace)
+
+
+def add_random_arguments(parser):
+    """给场景的命令行加上 --seed"""
+    parser.add_argument('--seed', type=int, default=None, help="随机数种子（固定后画面可以逐位复现）")
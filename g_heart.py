@@ -1,21 +1,35 @@
+import argparse
 import pygame
 import math
-import random
+from collections import OrderedDict
 from pygame.locals import *
 
-# 初始化Pygame
-pygame.init()
+from frame_profiler import FrameProfiler, add_profiler_arguments, profiler_from_args
+from frame_random import FrameRandom, add_random_arguments
+from heart_geometry import heart_outline, lod_samples
+from quality_governor import add_governor_arguments, governor_from_args, scaled
+from sprite_atlas import CircleAtlas, SpriteBatch
 
 # 定义颜色常量
 DARK_PINK = (255, 51, 153)
 LIGHT_PINK = (255, 182, 193)
 WHITE = (255, 255, 255)
 SHADOW_COLOR = (200, 0, 100)
+BACKGROUND = (30, 30, 30)  # 深灰色背景
+
+# 心形精灵缓存：缩放量化步长和LRU容量
+HEART_SCALE_STEP = 0.004
+HEART_CACHE_SIZE = 48
+
+# 粒子每帧损失的生命值（生命从1.0开始，约67帧后消亡）
+PARTICLE_DECAY = 0.015
 
 
 class HeartAnimation:
-    def __init__(self, screen_width=800, screen_height=600):
-        # 初始化显示设置
+    def __init__(self, screen_width=800, screen_height=600, cache_heart=True, sprites=False,
+                 particle_count=50, dirty_rects=False, spawn_rate=1, seed=None):
+        # 初始化显示设置（只初始化视频子系统，音频、手柄等用不到）
+        pygame.display.init()
         self.screen = pygame.display.set_mode((screen_width, screen_height), RESIZABLE)
         self.clock = pygame.time.Clock()
         self.running = True
@@ -25,43 +39,65 @@ class HeartAnimation:
         # 可调节参数
         self.base_scale = 0.8  # 减小基础尺寸
         self.animation_speed = 1.0
-        self.particle_count = 50
+        self.max_particles = particle_count
+        self.particle_count = particle_count  # 当前上限，由apply_quality调整
+        self.spawn_rate = spawn_rate  # 每帧生成的粒子数，可以是小数
+        self.spawn_credit = 0.0
         self.beat_frequency = 1.2
 
         # 初始化缩放比例
         self.current_scale = self.base_scale
 
-        # 初始化粒子系统
+        # 初始化粒子系统；颤动和新粒子的随机量都从共享随机源取，固定seed可逐位复现
         self.particles = []
+        self.rng = FrameRandom(seed)
+        # 可选：粒子走精灵图集 + 批量blit
+        self.sprite_batch = SpriteBatch(CircleAtlas()) if sprites else None
+
+        # 优化后的心形参数方程（更圆润），采样数按心跳最大时的屏幕宽度选择，
+        # 相邻渐变圆点间距约2.5像素，保证圆点连成连续的轮廓
+        max_width = 2 * 15 * 8 * self.base_scale * 1.1
+        samples = lod_samples(max_width, 'rounded', spacing=2.5)
+        self.heart_points = heart_outline('rounded', samples).tolist()
+
+        # 心形本体按缩放档位预渲染为精灵，LRU淘汰
+        self.cache_heart = cache_heart
+        self.heart_cache = OrderedDict()
+
+        # 可选：脏矩形模式，只清除、重绘并提交心形和粒子上一帧与这一帧覆盖的区域
+        self.dirty_rects = dirty_rects
+        self.previous_rects = []
+        self.full_redraw = True  # 第一帧、窗口大小改变、叠加层显示时整屏重绘
+        self.dirty = None  # 这一帧要提交的区域；None表示整屏flip
 
-        # 优化后的心形参数方程（更圆润）
-        self.heart_points = []
-        t = 0
-        while t < 2 * math.pi:
-            # 调整后的心形方程
-            x = 15 * (math.sin(t) ** 3)
-            y = 12.5 * math.cos(t) - 4.5 * math.cos(2 * t) - 2 * math.cos(3 * t) - 0.5 * math.cos(4 * t)
-            self.heart_points.append((x, y))
-            t += 0.02  # 增加采样密度
+    def apply_quality(self, quality):
+        """按画质（0..1）调整粒子上限；多出的粒子照常消亡，不会一次性清掉"""
+        self.particle_count = scaled(self.max_particles, quality, 1)
 
     def calculate_scale(self):
         """计算动态缩放比例"""
         time = pygame.time.get_ticks() / 1000
         beat = math.sin(time * math.pi * self.beat_frequency) * 0.08  # 减小跳动幅度
-        tremor = random.uniform(-0.008, 0.008)  # 减小颤动幅度
+        tremor = self.rng.uniform(-0.008, 0.008)  # 减小颤动幅度
         return self.base_scale * (1 + beat + tremor)
 
     def generate_particles(self):
-        """生成粒子效果"""
-        if len(self.particles) < self.particle_count:
-            angle = random.uniform(0, 2 * math.pi)
-            radius = random.uniform(8, 15) * self.current_scale  # 调整粒子生成范围
+        """生成粒子效果（每帧spawn_rate个，不超过粒子上限），这一帧新粒子的随机量一次取出"""
+        self.spawn_credit = min(self.spawn_credit + self.spawn_rate, max(1, self.spawn_rate))
+        count = max(0, min(int(self.spawn_credit), self.particle_count - len(self.particles)))
+        if count == 0:
+            return
+        self.spawn_credit -= count
+        # 每个粒子一行：角度, 生成半径, 水平速度, 竖直速度, 粒子半径
+        samples = self.rng.uniform((0, 8, -0.8, -1.5, 1), (2 * math.pi, 15, 0.8, 0, 2.5), (count, 5))
+        for angle, radius, speed_x, speed_y, size in samples.tolist():
+            radius *= self.current_scale  # 调整粒子生成范围
             x = self.center_x + radius * math.cos(angle)
             y = self.center_y + radius * math.sin(angle)
             self.particles.append({
                 'pos': [x, y],
-                'speed': [random.uniform(-0.8, 0.8), random.uniform(-1.5, 0)],
-                'radius': random.uniform(1, 2.5),  # 减小粒子尺寸
+                'speed': [speed_x, speed_y],
+                'radius': size,  # 减小粒子尺寸
                 'life': 1.0
             })
 
@@ -70,97 +106,235 @@ class HeartAnimation:
         for p in self.particles:
             p['pos'][0] += p['speed'][0] * self.animation_speed
             p['pos'][1] += p['speed'][1] * self.animation_speed
-            p['life'] -= 0.015 * self.animation_speed  # 延长生命周期
+            p['life'] -= PARTICLE_DECAY * self.animation_speed  # 延长生命周期
             p['speed'][1] += 0.08  # 减小重力效果
         self.particles = [p for p in self.particles if p['life'] > 0]
 
-    def calculate_color(self, y_pos):
-        """颜色渐变计算"""
-        progress = (y_pos - (self.center_y - 40 * self.current_scale)) / (80 * self.current_scale)
+    def calculate_color(self, y_pos, center_y=None, scale=None):
+        """颜色渐变计算（默认相对当前中心和缩放）"""
+        center_y = self.center_y if center_y is None else center_y
+        scale = self.current_scale if scale is None else scale
+        progress = (y_pos - (center_y - 40 * scale)) / (80 * scale)
         progress = max(0, min(1, progress))
         r = DARK_PINK[0] + (LIGHT_PINK[0] - DARK_PINK[0]) * progress
         g = DARK_PINK[1] + (LIGHT_PINK[1] - DARK_PINK[1]) * progress
         b = DARK_PINK[2] + (LIGHT_PINK[2] - DARK_PINK[2]) * progress
         return (int(r), int(g), int(b))
 
-    def draw_heart(self):
-        """绘制优化后的心形"""
+    def render_heart_body(self, surface, center_x, center_y, scale):
+        """把心形本体（阴影、渐变、高光）绘制到surface上"""
         # 生成基础形状坐标
         base_points = [
             (
-                x * 8 * self.current_scale,  # 减小放大倍数
-                y * 8 * self.current_scale
+                x * 8 * scale,  # 减小放大倍数
+                y * 8 * scale
             ) for x, y in self.heart_points
         ]
 
         # 主心形坐标
         main_points = [
-            (self.center_x + x, self.center_y - y) for x, y in base_points
+            (center_x + x, center_y - y) for x, y in base_points
         ]
 
         # 阴影层坐标（向右下方偏移）
         shadow_points = [
-            (self.center_x + x + 4 * self.current_scale,
-             self.center_y - y + 4 * self.current_scale)
+            (center_x + x + 4 * scale,
+             center_y - y + 4 * scale)
             for x, y in base_points
         ]
 
         # 高光层坐标（向左上方偏移并缩小）
         highlight_points = [
-            (self.center_x + x * 0.85 - 2 * self.current_scale,  # 修正高光位置
-             self.center_y - y * 0.85 - 2 * self.current_scale)
+            (center_x + x * 0.85 - 2 * scale,  # 修正高光位置
+             center_y - y * 0.85 - 2 * scale)
             for x, y in base_points
         ]
 
         # 绘制阴影
-        pygame.draw.polygon(self.screen, SHADOW_COLOR, shadow_points)
+        pygame.draw.polygon(surface, SHADOW_COLOR, shadow_points)
 
         # 绘制主心形（渐变填充）
         for point in main_points:
-            color = self.calculate_color(point[1])
-            pygame.draw.circle(self.screen, color, (int(point[0]), int(point[1])),
-                               int(3.5 * self.current_scale))  # 调整绘制尺寸
+            color = self.calculate_color(point[1], center_y, scale)
+            pygame.draw.circle(surface, color, (int(point[0]), int(point[1])),
+                               int(3.5 * scale))  # 调整绘制尺寸
 
         # 绘制高光边框
-        pygame.draw.polygon(self.screen, WHITE, highlight_points, 3)
+        pygame.draw.polygon(surface, WHITE, highlight_points, 3)
+
+    def heart_bounds(self, scale):
+        """心形本体相对中心的包围盒 (left, top, width, height)"""
+        # 轮廓 + 阴影偏移 + 圆点半径，再留2像素余量
+        xs = [x * 8 * scale for x, _ in self.heart_points]
+        ys = [-y * 8 * scale for _, y in self.heart_points]
+        pad = 4 * scale + 3.5 * scale + 2
+        left, top = int(min(xs) - pad), int(min(ys) - pad)
+        return left, top, int(max(xs) + pad) - left + 1, int(max(ys) + pad) - top + 1
+
+    def heart_sprite(self, bucket):
+        """取出（或渲染）某个缩放档位的心形精灵，返回 (surface, 中心偏移)"""
+        sprite = self.heart_cache.get(bucket)
+        if sprite is not None:
+            self.heart_cache.move_to_end(bucket)
+            return sprite
+
+        scale = bucket * HEART_SCALE_STEP
+        left, top, width, height = self.heart_bounds(scale)
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.render_heart_body(surface, -left, -top, scale)
+        sprite = (surface, (left, top))
+
+        self.heart_cache[bucket] = sprite
+        if len(self.heart_cache) > HEART_CACHE_SIZE:
+            self.heart_cache.popitem(last=False)
+        return sprite
+
+    def draw_heart(self):
+        """绘制优化后的心形"""
+        if not self.cache_heart:
+            self.render_heart_body(self.screen, self.center_x, self.center_y, self.current_scale)
+            return
+
+        # 按量化后的缩放档位取缓存精灵，整颗心每帧只需一次blit
+        bucket = round(self.current_scale / HEART_SCALE_STEP)
+        surface, (left, top) = self.heart_sprite(bucket)
+        self.screen.blit(surface, (self.center_x + left, self.center_y + top))
+
+    def heart_rect(self):
+        """这一帧心形本体在屏幕上的包围矩形"""
+        if self.cache_heart:
+            surface, (left, top) = self.heart_sprite(round(self.current_scale / HEART_SCALE_STEP))
+            return surface.get_rect(topleft=(self.center_x + left, self.center_y + top))
+        left, top, width, height = self.heart_bounds(self.current_scale)
+        return pygame.Rect(self.center_x + left, self.center_y + top, width, height)
+
+    def particles_rect(self):
+        """这一帧所有粒子的包围矩形；没有粒子时返回None"""
+        rects = []
+        for p in self.particles:
+            # 圆心与draw_particles相同：50×50临时表面的(25, 25)处，半径多留1像素
+            x = int(p['pos'][0] - p['radius']) + 25
+            y = int(p['pos'][1] - p['radius']) + 25
+            radius = math.ceil(p['radius']) + 1
+            rects.append(pygame.Rect(x - radius, y - radius, 2 * radius + 1, 2 * radius + 1))
+        return rects[0].unionall(rects[1:]) if rects else None
+
+    def draw_dirty(self):
+        """脏矩形模式：清除上一帧和这一帧的心形、粒子区域，重绘后只提交这些区域
+
+        这一帧画的内容都在当前矩形内，上一帧画过的内容都在上一帧的矩形内，
+        两者之外的像素保持背景色，不需要清除和提交。
+        """
+        rects = [rect for rect in (self.heart_rect(), self.particles_rect()) if rect is not None]
+        bounds = self.screen.get_rect()
+        if self.full_redraw:
+            self.screen.fill(BACKGROUND)
+            self.dirty = None
+            self.full_redraw = False
+        else:
+            self.dirty = [rect.clip(bounds) for rect in self.previous_rects + rects]
+            for rect in self.dirty:
+                self.screen.fill(BACKGROUND, rect)
+        self.draw_particles()
+        self.draw_heart()
+        self.previous_rects = rects
+
+    def present(self):
+        """整屏flip，或脏矩形模式下只提交这一帧的区域"""
+        if self.dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.dirty)
 
     def handle_resize(self, event):
         """窗口大小调整"""
         self.center_x = event.w // 2
         self.center_y = event.h // 2
+        self.full_redraw = True
 
-    def run(self):
-        while self.running:
-            self.screen.fill((30, 30, 30))  # 深灰色背景
+    def draw_particles(self):
+        """绘制粒子（半透明效果）"""
+        if self.sprite_batch is not None:
+            self.draw_particles_batched()
+            return
+
+        for p in self.particles:
+            alpha = int(200 * p['life'])  # 降低最大透明度
+            surface = pygame.Surface((50, 50), pygame.SRCALPHA)
+            pygame.draw.circle(surface, (255, 255, 255, alpha),
+                               (25, 25), int(p['radius']))
+            self.screen.blit(surface, (int(p['pos'][0] - p['radius']),
+                                       int(p['pos'][1] - p['radius'])))
 
+    def draw_particles_batched(self):
+        """与draw_particles相同的画面：圆心在50×50临时表面的(25, 25)处"""
+        batch = self.sprite_batch
+        for p in self.particles:
+            alpha = int(200 * p['life'])
+            x = int(p['pos'][0] - p['radius']) + 25
+            y = int(p['pos'][1] - p['radius']) + 25
+            batch.add(x, y, p['radius'], WHITE, alpha)
+        batch.flush(self.screen)
+
+    def step(self, profiler=None):
+        """推进并绘制一帧（不处理事件、不刷新显示）"""
+        self.current_scale = self.calculate_scale()
+
+        self.generate_particles()
+        self.update_particles()
+        if profiler is not None:
+            profiler.lap('update')
+
+        if self.dirty_rects:
+            self.draw_dirty()
+            return
+        self.screen.fill(BACKGROUND)
+        self.draw_particles()
+        self.draw_heart()
+
+    def run(self, profiler=None, governor=None):
+        profiler = profiler or FrameProfiler()
+        overlay_shown = False
+        while self.running:
+            profiler.begin_frame()
             for event in pygame.event.get():
+                if profiler.handle_event(event):
+                    continue
                 if event.type == QUIT:
                     self.running = False
                 elif event.type == VIDEORESIZE:
                     self.handle_resize(event)
+            profiler.lap('event')
 
-            self.current_scale = self.calculate_scale()
-
-            self.generate_particles()
-            self.update_particles()
+            # 叠加层可以出现在屏幕任何位置：显示时以及隐藏后的第一帧整屏重绘
+            if profiler.visible or overlay_shown:
+                self.full_redraw = True
+            overlay_shown = profiler.visible
 
-            # 绘制粒子（半透明效果）
-            for p in self.particles:
-                alpha = int(200 * p['life'])  # 降低最大透明度
-                surface = pygame.Surface((50, 50), pygame.SRCALPHA)
-                pygame.draw.circle(surface, (255, 255, 255, alpha),
-                                   (25, 25), int(p['radius']))
-                self.screen.blit(surface, (int(p['pos'][0] - p['radius']),
-                                           int(p['pos'][1] - p['radius'])))
+            self.step(profiler)
+            profiler.draw_overlay(self.screen)
+            profiler.lap('draw')
 
-            self.draw_heart()
-
-            pygame.display.flip()
+            self.present()
+            profiler.lap('flip')
             self.clock.tick(60)
+            profiler.end_frame()
+            if governor is not None and governor.update(profiler.work_ms):
+                self.apply_quality(governor.quality)
 
+        profiler.close()
         pygame.quit()
 
 
 if __name__ == "__main__":
-    animation = HeartAnimation()
-    animation.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="跳动的爱心")
+    parser.add_argument('--sprites', action='store_true', help="粒子使用精灵图集批量绘制")
+    parser.add_argument('--particles', type=int, default=50, help="粒子数量上限")
+    parser.add_argument('--dirty-rects', action='store_true', help="只重绘并提交心形和粒子所在的区域")
+    add_profiler_arguments(parser)
+    add_governor_arguments(parser)
+    add_random_arguments(parser)
+    args = parser.parse_args()
+    animation = HeartAnimation(sprites=args.sprites, particle_count=args.particles,
+                               dirty_rects=args.dirty_rects, seed=args.seed)
+    animation.run(profiler_from_args(args), governor_from_args(args))
\ No newline at end of file
@@ -1,8 +1,16 @@
+import argparse
 import pygame
 import math
-import random
+
+import numpy as np
 from pygame.locals import *
 
+from frame_cache import FrameCache, cache_key, lock_frequencies
+from frame_clock import FixedTimestep, frames, lerp
+from frame_profiler import FrameProfiler, add_profiler_arguments, profiler_from_args
+from frame_random import FrameRandom, add_random_arguments
+from heart_geometry import heart_layers
+
 
 class Vector3:
     """三维向量类"""
@@ -18,41 +26,31 @@ class Vector3:
         """向量加法"""
         return Vector3(self.x + other.x, self.y + other.y, self.z + other.z)
 
-    def dot(self, other):
-        """点积"""
-        return self.x * other.x + self.y * other.y + self.z * other.z
-
     def normalize(self):
         """归一化"""
         length = math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
         return Vector3(self.x / length, self.y / length, self.z / length)
 
-    def as_int(self):
-        """转换为整数元组"""
-        return (
-            min(255, max(0, int(self.x))),
-            min(255, max(0, int(self.y))),
-            min(255, max(0, int(self.z)))
-        )
-
-    @staticmethod
-    def from_color(color):
-        """从颜色元组创建向量"""
-        return Vector3(color[0], color[1], color[2])
-
-
-# 初始化Pygame
-pygame.init()
 
 # 颜色定义
 DEEP_PINK = (255, 20, 147)
 HOT_PINK = (255, 105, 180)
 SPEC_COLOR = (255, 255, 200)
 AMBIENT_COLOR = (255, 192, 203, 50)
+BACKGROUND = (30, 30, 50)
+
+# 光源方向三个分量的角频率（弧度/秒）
+LIGHT_FREQUENCIES = (1.0, 0.8, 0.6)
+
+# 粒子每1/60秒损失的生命值（生命从1.0开始，100步后消亡）
+PARTICLE_DECAY = 0.01
 
 
 class StereoHeart:
-    def __init__(self, width=400, height=300):
+    def __init__(self, width=400, height=300, sim_hz=60, fps=60, frame_cache=None, max_particles=200,
+                 spawn_rate=1, seed=None):
+        # 只初始化视频子系统，音频、手柄等用不到
+        pygame.display.init()
         self.screen = pygame.display.set_mode((width, height), RESIZABLE)
         self.clock = pygame.time.Clock()
         self.running = True
@@ -64,162 +62,325 @@ class StereoHeart:
         self.rotation = 0
         self.light_dir = Vector3(1, -1, 0.5).normalize()
 
-        # 动画参数
+        # 动画参数：模拟按sim_hz固定步长推进，渲染时在两步之间插值
+        self.sim_hz = sim_hz
+        self.fps = fps
+        self.sim_time = 0.0
         self.beat_phase = 0
+        self.beat_speed = 0.05  # 每1/60秒的心跳相位增量
+        self.rotation_speed = 0.7  # 每1/60秒的旋转角度
+        self.light_frequencies = LIGHT_FREQUENCIES
+        self.prev_beat_phase = self.view_beat_phase = 0
+        self.prev_rotation = self.view_rotation = 0
+        self.spawn_rate = spawn_rate  # 每1/60秒生成的粒子数，可以是小数
+        self.spawn_credit = 0.0
+        self.max_particles = max_particles
         self.particles = []
-        self.heart_points = self.generate_3d_heart()
+        # 新粒子的随机量从共享随机源批量取，固定seed可逐位复现
+        self.rng = FrameRandom(seed)
+        self.heart_count = self.generate_3d_heart()
 
         # 光照参数
         self.ambient_strength = 0.3
         self.specular_power = 20
 
+        # 可选：周期帧缓存。背景、光晕和心形只随周期变化，画过一个周期后直接回放，
+        # 每帧只实时绘制粒子。frame_cache为文件路径（跨启动保留）或True（临时文件）
+        self.frame_cache = None
+        self.cycle_frames = None
+        if frame_cache:
+            self.cache_path = frame_cache if isinstance(frame_cache, str) else None
+            self.lock_cycle()
+
     def generate_3d_heart(self, samples=300):
-        """生成3D心形顶点"""
-        points = []
-        for t in (i * 2 * math.pi / samples for i in range(samples)):
-            x = 15 * (math.sin(t) ** 3)
-            y = 12.5 * math.cos(t) - 4.5 * math.cos(2 * t) - 2 * math.cos(3 * t) - 0.5 * math.cos(4 * t)
-
-            # 创建三个深度层
-            for z in [-self.depth, 0, self.depth]:
-                scale = 1 + abs(z) / self.depth * 0.1
-                normal = Vector3(
-                    math.sin(t) * scale,
-                    math.cos(t) * scale,
-                    z / self.depth
-                ).normalize()
-                points.append({
-                    'pos': Vector3(x * scale, y * scale, z),
-                    'normal': normal
-                })
-        return points
-
-    def project_point(self, point):
-        """3D到2D投影"""
-        rot = self.rotation * math.pi / 180
-        x = point.x * math.cos(rot) - point.z * math.sin(rot)
-        z = point.x * math.sin(rot) + point.z * math.cos(rot)
-        y = point.y
-
-        scale = 10 * self.heart_scale * (1 + 0.1 * math.sin(self.beat_phase))
-        return (int(self.center[0] + x * scale),
-                int(self.center[1] - y * scale * 0.8 + z * scale * 0.3))
-
-    def calculate_lighting(self, normal):
-        """3D光照计算"""
-        diff = max(0, normal.dot(self.light_dir))
-        spec = diff ** self.specular_power
-        return min(1.0, self.ambient_strength + diff + spec)
-
-    def update_animation(self):
-        """更新动画状态"""
-        self.beat_phase += 0.05
-        self.rotation += 0.7
+        """生成3D心形顶点的逐顶点常量数组，返回顶点数"""
+        # 三个深度层的顶点和法线来自共享几何缓存
+        positions, normals = heart_layers('rounded', samples, self.depth)
+        self.init_heart_lighting(positions, normals)
+        self.init_heart_layers(positions, normals)
+        radii = np.maximum(2, (4 - np.abs(positions[:, 2]) / self.depth * 2).astype(np.int64))
+        self.heart_radii = radii.tolist()
+        return len(positions)
+
+    def init_heart_lighting(self, positions, normals):
+        """与光源无关的逐顶点常量：法线分量、按深度插值的基础颜色，以及每帧复用的缓冲区"""
+        self.normal_x, self.normal_y, self.normal_z = (np.ascontiguousarray(normals[:, i]) for i in range(3))
+        deep, hot = np.array(DEEP_PINK, dtype=np.float64), np.array(HOT_PINK, dtype=np.float64)
+        t = (positions[:, 2] + self.depth) / (2 * self.depth)
+        self.base_colors = deep + (hot - deep) * t[:, None]
+        self.spec_color = np.array(SPEC_COLOR, dtype=np.float64)
+
+        n = len(positions)
+        self.intensity = np.empty(n)
+        self.diffuse = np.empty(n)
+        self.mixed_colors = np.empty((n, 3))
+        self.final_colors = np.empty((n, 3), dtype=np.int64)
+
+    def init_heart_layers(self, positions, normals):
+        """投影用的坐标分量，以及按z分层的绘制顺序
+
+        顶点只分布在少数几个z层上，深度排序只看旋转前的z，所以层的先后固定：
+        layers按z从大到小排列，每层是 (z, 该层顶点下标列表)，层内保持顶点原顺序。
+        """
+        self.heart_x, self.heart_y, self.heart_z = (np.ascontiguousarray(positions[:, i]) for i in range(3))
+        # 高光点相对顶点投影位置的偏移
+        self.highlight_dx = (normals[:, 0] * 5).tolist()
+        self.highlight_dy = (normals[:, 1] * 5).tolist()
+        z = self.heart_z
+        self.layers = [(depth, np.flatnonzero(z == depth).tolist())
+                       for depth in sorted(set(z.tolist()), reverse=True)]
+
+    def heart_lighting(self):
+        """所有心形顶点这一帧的 (颜色列表, 是否画高光点列表)，整批数组运算
+
+        漫反射 + 镜面光 + 环境光，再混合基础颜色和高光颜色；运算顺序与逐顶点的
+        向量计算（打包heart/heart.py）相同，结果逐位一致。
+        """
+        light = self.light_dir
+        diff, intensity = self.diffuse, self.intensity
+        # 点积按分量展开（不走BLAS），与逐顶点点积的舍入相同
+        np.multiply(self.normal_x, light.x, out=diff)
+        diff += self.normal_y * light.y
+        diff += self.normal_z * light.z
+        np.maximum(diff, 0, out=diff)
+        np.add(self.ambient_strength, diff, out=intensity)
+        intensity += diff ** self.specular_power
+        np.minimum(intensity, 1.0, out=intensity)
+
+        # 基础颜色×光照 + 高光颜色×intensity⁵，截断取整后限制在0..255
+        colors = self.mixed_colors
+        np.multiply(self.base_colors, intensity[:, None], out=colors)
+        colors += self.spec_color * (intensity ** 5)[:, None]
+        final = self.final_colors
+        final[:] = colors
+        np.clip(final, 0, 255, out=final)
+        return final.tolist(), (intensity > 0.7).tolist()
+
+    def project_arrays(self, x, y, z):
+        """3D到2D投影（使用渲染插值后的旋转角和心跳相位），返回屏幕坐标列表 (xs, ys)
+
+        整批顶点共用一次旋转的sin/cos；运算顺序与逐点投影相同，取整同 int()。
+        """
+        rot = self.view_rotation * math.pi / 180
+        cos, sin = math.cos(rot), math.sin(rot)
+        rotated_x = x * cos - z * sin
+        rotated_z = x * sin + z * cos
+
+        scale = 10 * self.heart_scale * (1 + 0.1 * math.sin(self.view_beat_phase))
+        xs = (self.center[0] + rotated_x * scale).astype(np.int64)
+        ys = (self.center[1] - y * scale * 0.8 + rotated_z * scale * 0.3).astype(np.int64)
+        return xs.tolist(), ys.tolist()
+
+    def lock_cycle(self):
+        """把旋转、心跳和光源调成同一个周期：cycle_frames个1/60秒后画面完全重复
+
+        一圈旋转的帧数取整，周期取能让三个光源频率仍然各不相同的最少圈数（默认参数下
+        是4圈，2056帧）。光源频率取为周期频率的整数倍：默认的 1.0/0.8/0.6 弧度/秒
+        变为 5:4:3 倍的 0.183，光源沿原来的路径走，只是慢了约8%；心跳频率取为
+        周期频率的整数倍，与原值相差约2%。
+        """
+        rotation_frames = round(360 / self.rotation_speed)
+        self.rotation_speed = 360 / rotation_frames
+        self.cycle_frames, self.light_frequencies = lock_frequencies(rotation_frames, LIGHT_FREQUENCIES)
+        beats = max(1, round(self.cycle_frames * self.beat_speed / (2 * math.pi)))
+        self.beat_speed = 2 * math.pi * beats / self.cycle_frames
+
+    def light_direction(self, time):
+        """time秒时的光源方向"""
+        fx, fy, fz = self.light_frequencies
+        return Vector3(math.cos(time * fx), math.sin(time * fy), math.sin(time * fz)).normalize()
+
+    def update_animation(self, dt=1 / 60):
+        """更新动画状态，推进dt秒（原始参数按每1/60秒一步给出）"""
+        k = frames(dt)
+        self.sim_time += dt
+        self.prev_beat_phase, self.prev_rotation = self.beat_phase, self.rotation
+        self.beat_phase += self.beat_speed * k
+        self.rotation += self.rotation_speed * k
 
         # 更新光源方向
-        time = pygame.time.get_ticks() / 1000
-        self.light_dir = Vector3(
-            math.cos(time),
-            math.sin(time * 0.8),
-            math.sin(time * 0.6)
-        ).normalize()
-
-        # 生成粒子
-        if len(self.particles) < 200:
+        self.light_dir = self.light_direction(self.sim_time)
+
+        # 生成粒子（每1/60秒spawn_rate个，最多补5步的量）
+        self.spawn_credit = min(self.spawn_credit + self.spawn_rate * k, 5 * max(1, self.spawn_rate))
+        count = max(0, min(int(self.spawn_credit), self.max_particles - len(self.particles)))
+        self.spawn_credit -= count
+        # 每个粒子一行：位置偏移 (x, y, z)，速度 (x, y, z)
+        depth = self.depth
+        samples = self.rng.uniform((-50, -40, -depth, -1, -1, -0.5), (50, 40, depth, 1, 1, 0.5), (count, 6))
+        for x, y, z, vx, vy, vz in samples.tolist():
             self.particles.append({
-                'pos': Vector3(
-                    self.center[0] + random.uniform(-50, 50),
-                    self.center[1] + random.uniform(-40, 40),
-                    random.uniform(-self.depth, self.depth)
-                ),
-                'vel': Vector3(
-                    random.uniform(-1, 1),
-                    random.uniform(-1, 1),
-                    random.uniform(-0.5, 0.5)
-                ),
+                'pos': Vector3(self.center[0] + x, self.center[1] + y, z),
+                'vel': Vector3(vx, vy, vz),
                 'life': 1.0
             })
 
         # 更新粒子状态
+        damping = 0.95 ** k
         for p in self.particles:
-            p['pos'] = p['pos'] + p['vel'] * 0.3
-            p['vel'] = p['vel'] * 0.95
-            p['life'] -= 0.01
+            p['prev'] = p['pos']
+            p['pos'] = p['pos'] + p['vel'] * (0.3 * k)
+            p['vel'] = p['vel'] * damping
+            p['life'] -= PARTICLE_DECAY * k
         self.particles = [p for p in self.particles if p['life'] > 0]
 
-    def draw_scene(self):
-        """绘制3D场景"""
-        self.screen.fill((30, 30, 50))
+    def draw_scene(self, alpha=1.0):
+        """绘制3D场景；alpha为渲染插值系数（0: 上一模拟步, 1: 当前步）"""
+        self.view_beat_phase = lerp(self.prev_beat_phase, self.beat_phase, alpha)
+        self.view_rotation = lerp(self.prev_rotation, self.rotation, alpha)
+
+        if self.cycle_frames is not None:
+            # 静态层来自帧缓存，粒子画在最上面（不再与心形按深度交错）
+            self.draw_cached_layer()
+            particles = self.particle_draw_list(alpha)
+            self.draw_particles(particles, 0, len(particles[0]))
+            return
+
+        self.draw_background()
+        heart = self.heart_draw_list()
+
+        # 从远到近（z从大到小）：心形按层整层绘制，粒子按z排序后插到层之间；
+        # z相同时粒子在前，与对 粒子+心形顶点 整体稳定排序的顺序相同
+        particles = self.particle_draw_list(alpha)
+        depths = particles[-1]
+        drawn = 0
+        for depth, indices in self.layers:
+            upto = np.searchsorted(depths, -depth, side='right')
+            self.draw_particles(particles, drawn, upto)
+            drawn = upto
+            self.draw_heart_layer(indices, *heart)
+        self.draw_particles(particles, drawn, len(depths))
+
+    def draw_background(self):
+        """背景和环境光晕"""
+        self.screen.fill(BACKGROUND)
 
         # 环境光晕
         glow = pygame.Surface((400, 400), pygame.SRCALPHA)
         pygame.draw.circle(glow, AMBIENT_COLOR, (200, 200),
-                           180 + 30 * math.sin(self.beat_phase))
+                           180 + 30 * math.sin(self.view_beat_phase))
         self.screen.blit(glow, (self.center[0] - 200, self.center[1] - 200))
 
-        # 深度排序
-        sorted_objects = sorted(
-            self.particles + self.heart_points,
-            key=lambda x: x['pos'].z if isinstance(x, dict) else x['pos'].z,
-            reverse=True
-        )
-
-        for obj in sorted_objects:
-            if 'vel' in obj:  # 绘制粒子
-                pos = self.project_point(obj['pos'])
-                alpha = int(200 * obj['life'])
-                size = max(1, int(3 - abs(obj['pos'].z) / self.depth * 2))
-                color = (255, 255 - size * 40, 255 - size * 60, alpha)
-                pygame.draw.circle(self.screen, color, pos, size)
-            else:  # 绘制心形
-                pos = self.project_point(obj['pos'])
-                intensity = self.calculate_lighting(obj['normal'])
-
-                # 计算基础颜色
-                base_color = Vector3.from_color(DEEP_PINK)
-                target_color = Vector3.from_color(HOT_PINK)
-                t = (obj['pos'].z + self.depth) / (2 * self.depth)
-                base_color = Vector3(
-                    base_color.x + (target_color.x - base_color.x) * t,
-                    base_color.y + (target_color.y - base_color.y) * t,
-                    base_color.z + (target_color.z - base_color.z) * t
-                )
-
-                # 计算高光颜色
-                spec_strength = intensity ** 5
-                spec_color = Vector3.from_color(SPEC_COLOR) * spec_strength
-
-                # 混合颜色
-                final_color = (base_color * intensity + spec_color).as_int()
-
-                # 绘制
-                radius = max(2, int(4 - abs(obj['pos'].z) / self.depth * 2))
-                pygame.draw.circle(self.screen, final_color, pos, radius)
-
-                # 添加高光点
-                if intensity > 0.7:
-                    highlight_pos = (
-                        pos[0] + obj['normal'].x * 5,
-                        pos[1] + obj['normal'].y * 5
-                    )
-                    pygame.draw.circle(self.screen, (255, 255, 255, 150), highlight_pos, 1)
-
-    def run(self):
+    def heart_draw_list(self):
+        """所有心形顶点这一帧的 (xs, ys, 颜色, 是否画高光点)"""
+        xs, ys = self.project_arrays(self.heart_x, self.heart_y, self.heart_z)
+        colors, highlights = self.heart_lighting()
+        return xs, ys, colors, highlights
+
+    def draw_heart_layer(self, indices, xs, ys, colors, highlights):
+        circle, screen = pygame.draw.circle, self.screen
+        radii, dx, dy = self.heart_radii, self.highlight_dx, self.highlight_dy
+        for i in indices:
+            pos = (xs[i], ys[i])
+            circle(screen, colors[i], pos, radii[i])
+
+            # 添加高光点
+            if highlights[i]:
+                circle(screen, (255, 255, 255, 150), (pos[0] + dx[i], pos[1] + dy[i]), 1)
+
+    def particle_draw_list(self, alpha=1.0):
+        """按z从大到小排好的粒子 (xs, ys, 颜色, 大小, -z)，-z升序供searchsorted使用"""
+        particles = self.particles
+        if not particles:
+            return [], [], [], [], np.empty(0)
+        pos = np.array([(p['pos'].x, p['pos'].y, p['pos'].z) for p in particles])
+        view = pos
+        if alpha < 1.0:
+            points = [p.get('prev', p['pos']) for p in particles]
+            prev = np.array([(v.x, v.y, v.z) for v in points])
+            view = prev + (pos - prev) * alpha
+
+        # 稳定排序，z相同的粒子保持生成顺序
+        depths = -pos[:, 2]
+        order = np.argsort(depths, kind='stable')
+        xs, ys = self.project_arrays(view[order, 0], view[order, 1], view[order, 2])
+        sizes = np.maximum(1, (3 - np.abs(pos[order, 2]) / self.depth * 2).astype(np.int64)).tolist()
+        opacity = (200 * np.array([p['life'] for p in particles])[order]).astype(np.int64).tolist()
+        colors = [(255, 255 - size * 40, 255 - size * 60, a) for size, a in zip(sizes, opacity)]
+        return xs, ys, colors, sizes, depths[order]
+
+    def draw_particles(self, particles, start, stop):
+        """画排好序的粒子里 [start, stop) 这一段"""
+        xs, ys, colors, sizes, _ = particles
+        circle, screen = pygame.draw.circle, self.screen
+        for i in range(start, stop):
+            circle(screen, colors[i], (xs[i], ys[i]), sizes[i])
+
+    def open_frame_cache(self):
+        """按当前窗口大小打开帧缓存；参数指纹涵盖所有影响静态层的设置"""
+        if self.frame_cache is not None:
+            self.frame_cache.close()
+        size = self.screen.get_size()
+        key = cache_key(size, self.center, self.heart_scale, self.depth, self.cycle_frames,
+                        self.beat_speed, self.light_frequencies, self.ambient_strength,
+                        self.specular_power, DEEP_PINK, HOT_PINK, SPEC_COLOR, AMBIENT_COLOR, BACKGROUND)
+        self.frame_cache = FrameCache(self.cache_path, self.cycle_frames, size, key)
+
+    def draw_cached_layer(self):
+        """回放周期里这一帧的静态层；还没画过时按这一帧的精确状态画出并存入缓存"""
+        if self.frame_cache is None or self.frame_cache.size != self.screen.get_size():
+            self.open_frame_cache()
+        index = round(self.view_rotation / self.rotation_speed) % self.cycle_frames
+        frame = self.frame_cache.get(index)
+        if frame is not None:
+            self.screen.blit(frame, (0, 0))
+            return
+
+        view = self.view_rotation, self.view_beat_phase, self.light_dir
+        self.view_rotation = index * self.rotation_speed
+        self.view_beat_phase = index * self.beat_speed
+        self.light_dir = self.light_direction(index / 60)
+        self.draw_background()
+        heart = self.heart_draw_list()
+        for _, indices in self.layers:
+            self.draw_heart_layer(indices, *heart)
+        self.frame_cache.put(index, self.screen)
+        self.view_rotation, self.view_beat_phase, self.light_dir = view
+
+    def close(self):
+        if self.frame_cache is not None:
+            self.frame_cache.close()
+            self.frame_cache = None
+
+    def run(self, profiler=None):
+        profiler = profiler or FrameProfiler()
+        sim_clock = FixedTimestep(self.sim_hz)
         while self.running:
+            profiler.begin_frame()
             for event in pygame.event.get():
+                if profiler.handle_event(event):
+                    continue
                 if event.type == QUIT:
                     self.running = False
                 elif event.type == VIDEORESIZE:
                     self.center = (event.w // 2, event.h // 2)
-
-            self.update_animation()
-            self.draw_scene()
+            profiler.lap('event')
+
+            for _ in range(sim_clock.advance()):
+                self.update_animation(sim_clock.dt)
+            profiler.lap('update')
+            self.draw_scene(sim_clock.alpha)
+            profiler.draw_overlay(self.screen)
+            profiler.lap('draw')
             pygame.display.flip()
-            self.clock.tick(60)
+            profiler.lap('flip')
+            self.clock.tick(self.fps)
+            profiler.end_frame()
 
+        profiler.close()
+        self.close()
         pygame.quit()
 
 
 if __name__ == "__main__":
-    StereoHeart().run()
+    parser = argparse.ArgumentParser(description="立体爱心")
+    parser.add_argument('--sim-hz', type=float, default=60, help="动画模拟频率")
+    parser.add_argument('--fps', type=int, default=60, help="渲染帧率上限（0为不限）")
+    parser.add_argument('--frame-cache', nargs='?', const=True, metavar='PATH',
+                        help="缓存一个周期的静态心形层并回放；给出PATH时缓存文件跨启动保留")
+    add_profiler_arguments(parser)
+    add_random_arguments(parser)
+    args = parser.parse_args()
+    StereoHeart(sim_hz=args.sim_hz, fps=args.fps, frame_cache=args.frame_cache,
+                seed=args.seed).run(profiler_from_args(args))
     pygame.quit()
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""共享的心形几何：带缓存的轮廓和3D分层顶点
+
+所有场景用的都是同一条参数曲线
+    x = a·sin³t
+    y = b·cos t − c·cos 2t − d·cos 3t − e·cos 4t
+只是系数略有不同（VARIANTS）。这里按 (变体, 采样数, 缩放) 缓存计算结果，
+返回只读的NumPy数组，多个场景/多次调用共享同一份数据。
+
+采样数可以用 lod_samples 按心形在屏幕上的像素宽度自动选择，小尺寸的心形
+不再为300多个顶点买单。
+
+这里不提供填充点集：claude3_7_heart 的内部粒子每个都取随机的半径系数，
+g_heart 的心形本体用 pygame.draw.polygon 填充，都没有可以共享缓存的固定点集。
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# 曲线系数 (a, b, c, d, e)
+VARIANTS = {
+    'classic': (16, 13, 5, 2, 1),  # 经典心形：claude_heart, dance_heart, 3D_heart, claude3_7_heart
+    'rounded': (15, 12.5, 4.5, 2, 0.5),  # 更圆润的心形：g_heart, g_heart_2
+}
+
+
+def heart_curve(t, variant='classic'):
+    """在参数t（标量或数组）处求曲线坐标，返回 (x, y)"""
+    a, b, c, d, e = VARIANTS[variant]
+    x = a * np.sin(t) ** 3
+    y = b * np.cos(t) - c * np.cos(2 * t) - d * np.cos(3 * t) - e * np.cos(4 * t)
+    return x, y
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+@lru_cache(maxsize=64)
+def heart_outline(variant='classic', samples=300, scale=1.0):
+    """均匀参数采样的闭合轮廓，形状 (samples, 2)，t = 2πi/samples"""
+    t = np.arange(samples) * (2 * math.pi / samples)
+    x, y = heart_curve(t, variant)
+    return _frozen(np.column_stack((x, y)) * scale)
+
+
+@lru_cache(maxsize=16)
+def heart_layers(variant='rounded', samples=300, depth=3.0, scale=1.0):
+    """三个深度层（z = −depth, 0, depth）的3D心形，返回 (positions, normals)
+
+    两个数组形状都是 (samples·3, 3)，按 t 优先、层次其次排列。外层按
+    1 + |z|/depth·0.1 放大；法线为 (sin t, cos t, z/depth) 缩放后归一化。
+    """
+    t = np.arange(samples) * (2 * math.pi / samples)
+    x, y = heart_curve(t, variant)
+    z = np.array([-depth, 0.0, depth])
+    layer_scale = 1 + np.abs(z) / depth * 0.1
+
+    positions = np.empty((samples, 3, 3))
+    positions[:, :, 0] = np.outer(x, layer_scale) * scale
+    positions[:, :, 1] = np.outer(y, layer_scale) * scale
+    positions[:, :, 2] = z * scale
+
+    normals = np.empty((samples, 3, 3))
+    normals[:, :, 0] = np.outer(np.sin(t), layer_scale)
+    normals[:, :, 1] = np.outer(np.cos(t), layer_scale)
+    normals[:, :, 2] = z / depth
+    normals /= np.linalg.norm(normals, axis=2, keepdims=True)
+
+    return _frozen(positions.reshape(-1, 3)), _frozen(normals.reshape(-1, 3))
+
+
+@lru_cache(maxsize=None)
+def _perimeter_to_width(variant):
+    """曲线周长与宽度之比（用密集采样一次性算出）"""
+    outline = heart_outline(variant, 4096)
+    perimeter = np.linalg.norm(np.diff(outline, axis=0, append=outline[:1]), axis=1).sum()
+    return perimeter / (2 * VARIANTS[variant][0])
+
+
+def lod_samples(width_px, variant='classic', spacing=2.0, min_samples=24, max_samples=1024):
+    """按屏幕上心形的像素宽度选采样数，使相邻顶点相距约spacing像素
+
+    结果向上取整到8的倍数，连续变化的尺寸只会落到少数几个缓存键上。
+    """
+    samples = _perimeter_to_width(variant) * width_px / spacing
+    samples = int(math.ceil(samples / 8)) * 8
+    return max(min_samples, min(max_samples, samples))
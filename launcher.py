@@ -0,0 +1,89 @@
+"""场景启动器：列出全部场景，只导入选中的那一个
+
+    python launcher.py                                   # 列出场景
+    python launcher.py dance_heart --engine numpy        # 场景名后面的参数原样交给场景
+    python launcher.py --first-frame g_heart_2           # 报告冷启动耗时后立即退出
+    python launcher.py --skip-pkg-resources g_heart      # 不让pygame导入pkg_resources
+
+启动器本身只用标准库：pygame在选定场景之后才导入，NumPy、PyOpenGL由场景
+模块按需导入，场景只初始化视频子系统。场景以 __main__ 身份运行，
+和直接 python g_heart.py 完全相同。
+
+第一次 display.flip()/update() 时在stderr报告冷启动耗时（从启动器开始执行算起），
+分为导入pygame和场景导入+初始化两段。
+
+--skip-pkg-resources（可选）：pygame.pkgdata 只用 pkg_resources 查找自带的字体
+文件，而导入 pkg_resources 要一百多毫秒（导入pygame从约250 ms降到约135 ms）。
+开启后启动器在 sys.modules 里把它登记为不存在，pygame退回到按模块路径直接打开
+文件，默认字体照常可用；代价是这个进程里任何 import pkg_resources 都会抛出
+ImportError（"import of pkg_resources halted"）。现有场景都不使用它。
+"""
+import argparse
+import os
+import runpy
+import sys
+import time
+
+START = time.perf_counter()
+
+# 场景名 -> (说明, 额外依赖)
+SCENES = {
+    'g_heart': ("2D心形 + 上飘粒子", ('numpy',)),
+    'g_heart_2': ("分层3D心形，带光照和粒子", ('numpy',)),
+    'dance_heart': ("粒子聚成的跳动心形，可选numpy/多进程引擎", ('numpy',)),
+    '3D_heart': ("旋转的3D粒子心形", ('numpy',)),
+    'claude3_7_heart': ("轮廓和内部填充粒子的跳动心形", ('numpy',)),
+    'claude_heart': ("OpenGL粒子心形", ('numpy', 'PyOpenGL')),
+}
+
+
+def list_scenes():
+    width = max(map(len, SCENES))
+    for name, (description, needs) in SCENES.items():
+        print(f"{name:<{width}}  {description}（需要 {', '.join(needs)}）")
+
+
+def report_first_frame(pygame, scene_start, exit_after):
+    """包装display.flip/update：第一次调用时报告耗时，然后换回原函数"""
+    display = pygame.display
+    originals = display.flip, display.update
+
+    def wrap(present):
+        def first_present(*args, **kwargs):
+            present(*args, **kwargs)
+            display.flip, display.update = originals
+            now = time.perf_counter()
+            print(f"冷启动 {(now - START) * 1000:.1f} ms：导入pygame {(scene_start - START) * 1000:.1f} ms，"
+                  f"场景导入和初始化到第一帧 {(now - scene_start) * 1000:.1f} ms", file=sys.stderr)
+            if exit_after:
+                # 让场景按关闭窗口的路径正常退出（释放进程池、写完trace）
+                pygame.event.post(pygame.event.Event(pygame.QUIT))
+        return first_present
+
+    display.flip, display.update = map(wrap, originals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列出并启动爱心场景")
+    parser.add_argument('--first-frame', action='store_true', help="画完第一帧、报告冷启动耗时后关闭场景")
+    parser.add_argument('--skip-pkg-resources', action='store_true',
+                        help="不让pygame导入pkg_resources（启动快约100 ms，进程内import pkg_resources会失败）")
+    parser.add_argument('scene', nargs='?', choices=SCENES, help="要启动的场景（省略时列出全部场景）")
+    parser.add_argument('args', nargs=argparse.REMAINDER, help="交给场景的命令行参数")
+    options = parser.parse_args()
+    if options.scene is None:
+        list_scenes()
+        return
+
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    if options.skip_pkg_resources:
+        sys.modules.setdefault('pkg_resources', None)
+    import pygame
+
+    report_first_frame(pygame, time.perf_counter(), options.first_frame)
+    sys.argv = [options.scene + '.py'] + options.args
+    runpy.run_module(options.scene, run_name='__main__', alter_sys=True)
+
+
+if __name__ == '__main__':
+    main()
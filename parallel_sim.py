@@ -0,0 +1,240 @@
+"""dance_heart 的多进程粒子模拟（共享内存）
+
+粒子数组放在 multiprocessing.shared_memory 里，每个工作进程负责连续的一段，
+原地调用 dance_physics.step_particles；主进程只写入每帧参数并负责渲染。
+每帧用信号量同步：
+
+    主进程:   写参数 -> 逐个 start[i].release()                   -> done.acquire() ×N -> 渲染
+    工作进程:           start[i].acquire() -> 更新自己的段 -> done.release()
+
+开启粒子间斥力时，工作进程先读全部位置算出自己这段的斥力，在工作进程之间的
+repel 屏障上等齐后才开始移动粒子，保证没有进程读到别人这一帧已经改过的位置。
+
+工作进程用 'spawn' 方式启动，不会继承父进程的SDL状态。
+
+主进程不等任何屏障：multiprocessing 的屏障（条件变量）在等待者被杀死后，
+超时或中止时的 notify 会一直等那个死掉的进程，主进程反而卡在 wait 里。
+主进程等 done 时按 POLL_INTERVAL 分段，其间检查工作进程是否已经退出；
+工作进程抛出异常时置失败标志并放行 done，主进程立即醒来。不论是工作进程
+出错、被杀还是卡住（超过timeout），step 都会先停掉全部工作进程、删除共享内存段
+（已有的数组视图仍然可读），再抛出写明各工作进程退出码的 RuntimeError；
+close() 照常收尾，不再报错。
+"""
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from dance_physics import DARK_PINK, particle_repulsion, step_particles
+from frame_random import FrameRandom
+
+# 控制块布局（float64）：scale, width, height, 停止标志, 是否计算粒子间斥力, 活跃粒子数,
+# 工作进程出错标志
+SCALE, WIDTH, HEIGHT, STOP, REPEL, ACTIVE, FAILED = range(7)
+CONTROL_SIZE = 7
+
+# 共享的粒子数组：(名称, 列数, dtype)
+FIELDS = (
+    ('pos', 2, np.float64),
+    ('vel', 2, np.float64),
+    ('colors', 3, np.uint8),
+    ('target_shape', 2, np.float64),
+)
+
+# 主进程等待工作进程的最长时间（秒），超过即认为工作进程已经失效
+STEP_TIMEOUT = 10.0
+# 发现工作进程失效后，等它们退出（以便报告退出码）的最长时间（秒）
+EXIT_GRACE = 1.0
+# 主进程等待一帧完成时，检查工作进程是否已经退出的间隔（秒）
+POLL_INTERVAL = 0.1
+
+
+def _views(blocks, count):
+    """把共享内存块映射为numpy数组"""
+    arrays = {'control': np.ndarray((CONTROL_SIZE,), np.float64, blocks['control'].buf)}
+    for name, columns, dtype in FIELDS:
+        arrays[name] = np.ndarray((count, columns), dtype, blocks[name].buf)
+    return arrays
+
+
+def _worker(names, count, start, stop, seed, go, repel_barrier, done):
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, name in names.items()}
+    arrays = _views(blocks, count)
+    control = arrays['control']
+    rng = FrameRandom(seed)
+    try:
+        while True:
+            go.acquire()
+            if control[STOP]:
+                break
+            # 只更新活跃前缀里属于自己的部分，其余粒子原样保留
+            active = int(control[ACTIVE])
+            end = max(start, min(stop, active))
+            force = None
+            if control[REPEL]:
+                force = particle_repulsion(arrays['pos'][:active], start, end)
+                repel_barrier.wait()
+            if end > start:
+                # FIELDS的顺序就是 step_particles 的 pos, vel, colors, target_shape
+                step_particles(*(arrays[name][start:end] for name, _, _ in FIELDS),
+                               control[SCALE], int(control[WIDTH]), int(control[HEIGHT]), rng, force)
+            done.release()
+    except BaseException:
+        # 先告诉主进程这一帧不会完成，再放开在repel上等自己的其他工作进程
+        control[FAILED] = 1
+        done.release()
+        repel_barrier.abort()
+        raise
+    finally:
+        # 先释放数组视图，共享内存才能关闭
+        del control, arrays
+        for block in blocks.values():
+            block.close()
+
+
+class ParallelParticleSim:
+    """分给一组工作进程更新的粒子状态
+
+    pos / vel / colors 是共享内存上的numpy视图，两次step之间可以直接拿来渲染；
+    close() 之后这些视图失效，不能再访问。
+    """
+
+    def __init__(self, target_shape, width, height, workers=None, seed=None, repulsion=False,
+                 timeout=STEP_TIMEOUT):
+        count = len(target_shape)
+        self.count = count
+        self.timeout = timeout
+        self.workers = max(1, min(workers or os.cpu_count() or 1, count))
+        self._processes = []
+        self._running = False
+        self._unlinked = False
+
+        self._blocks = {'control': shared_memory.SharedMemory(create=True, size=CONTROL_SIZE * 8)}
+        for name, columns, dtype in FIELDS:
+            size = max(1, count * columns * np.dtype(dtype).itemsize)
+            self._blocks[name] = shared_memory.SharedMemory(create=True, size=size)
+        arrays = _views(self._blocks, count)
+        self.control = arrays['control']
+        self.pos, self.vel, self.colors = arrays['pos'], arrays['vel'], arrays['colors']
+        self.target_shape = arrays['target_shape']
+
+        # 每个进程一个独立的随机流
+        seeds = np.random.SeedSequence(seed).spawn(self.workers + 1)
+        self.rng = FrameRandom(seeds[0])
+        self.control[:] = 0
+        self.control[REPEL] = repulsion
+        self.control[ACTIVE] = count
+        self.target_shape[:] = target_shape
+        self.reset(width, height)
+
+        context = multiprocessing.get_context('spawn')
+        # 每个工作进程一个放行信号量，快的进程不会在同一帧里多拿一次
+        self._go = [context.Semaphore(0) for _ in range(self.workers)]
+        self._repel = context.Barrier(self.workers)
+        self._done = context.Semaphore(0)
+        names = {key: block.name for key, block in self._blocks.items()}
+        bounds = np.linspace(0, count, self.workers + 1).astype(int)
+        self._processes = [
+            context.Process(target=_worker, daemon=True,
+                            args=(names, count, bounds[i], bounds[i + 1], seeds[i + 1],
+                                  self._go[i], self._repel, self._done))
+            for i in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+    def reset(self, width, height):
+        """把所有粒子随机撒到屏幕上"""
+        self.wait_step()
+        self.pos[:] = self.rng.uniform((0, 0), (width, height), size=(self.count, 2))
+        self.vel[:] = 0
+        self.colors[:] = DARK_PINK
+
+    def set_active(self, count):
+        """只模拟前count个粒子（不重新分配共享内存）"""
+        self.wait_step()
+        self.control[ACTIVE] = max(0, min(self.count, count))
+
+    def start_step(self, scale, width, height):
+        """写入本帧参数并放行工作进程（不等待完成）"""
+        self.control[SCALE] = scale
+        self.control[WIDTH] = width
+        self.control[HEIGHT] = height
+        for go in self._go:
+            go.release()
+        self._running = True
+
+    def wait_step(self):
+        """等待所有工作进程完成当前帧；工作进程出错、退出或超时时抛出 RuntimeError"""
+        if self._running:
+            self._running = False
+            self._wait_done()
+
+    def step(self, scale, width, height):
+        self.start_step(scale, width, height)
+        self.wait_step()
+
+    def _wait_done(self):
+        """等每个工作进程报告完成；有工作进程出错、退出或超时时收尾并抛出 RuntimeError"""
+        deadline = time.monotonic() + self.timeout
+        for _ in range(self.workers):
+            while not self._done.acquire(timeout=POLL_INTERVAL):
+                if time.monotonic() > deadline or any(p.exitcode is not None for p in self._processes):
+                    raise self._worker_failure()
+            if self.control[FAILED]:
+                raise self._worker_failure()
+
+    def _worker_failure(self):
+        """停掉全部工作进程、删除共享内存段，返回写明各工作进程状态的 RuntimeError"""
+        # 还在等下一帧的工作进程收到停止标志后正常退出，只有真正卡住的才报“无响应”
+        self.control[STOP] = 1
+        for go in self._go:
+            go.release()
+        deadline = time.monotonic() + EXIT_GRACE
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        states = ', '.join(
+            f"#{i} 退出码 {process.exitcode}" if process.exitcode is not None else f"#{i} 无响应"
+            for i, process in enumerate(self._processes))
+        self._stop_processes(0)
+        # 只删除名字不解除映射：调用方手里的数组视图仍然有效，close() 时再解除
+        self._unlink()
+        return RuntimeError(f"并行粒子模拟的工作进程失效（{states}），已停止工作进程并删除共享内存段")
+
+    def _stop_processes(self, timeout):
+        """等工作进程退出，超时仍未退出的直接结束（被暂停的进程收不到SIGTERM，再用kill）"""
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(EXIT_GRACE)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._processes = []
+
+    def _unlink(self):
+        if not self._unlinked:
+            for block in self._blocks.values():
+                block.unlink()
+            self._unlinked = True
+
+    def close(self):
+        """停止工作进程并释放共享内存"""
+        try:
+            self.wait_step()
+        except RuntimeError:
+            pass  # 工作进程已经失效，_worker_failure 已经停掉它们并删除了共享内存段
+        if self._processes:
+            self.control[STOP] = 1
+            for go in self._go:
+                go.release()
+            self._stop_processes(self.timeout)
+        if self._blocks:
+            del self.pos, self.vel, self.colors, self.target_shape, self.control
+            self._unlink()
+            for block in self._blocks.values():
+                block.close()
+            self._blocks = {}
@@ -0,0 +1,93 @@
+"""自适应画质：根据实测帧时间调整粒子数和特效，守住帧时间预算
+
+    governor = QualityGovernor(budget_ms=16.6)
+    while running:
+        ...
+        profiler.end_frame()
+        if governor.update(profiler.work_ms):
+            scene.apply_quality(governor.quality)
+
+quality 在 [min_quality, 1] 之间，场景把它换算成活跃粒子数、拖尾采样数、
+高光数量等。判断用帧时间的指数滑动平均，并带滞回：
+
+  * 平均值连续 down_frames 帧高于 预算×high 时降档（×down_step）；
+  * 连续 up_frames 帧低于 预算×low 时升档（×up_step），升得比降得慢；
+  * 每次调整后等 settle_frames 帧再判断，让新设置的帧时间先反映到平均值里。
+
+low < high 之间的区间不动作，画质不会在预算附近来回抖动。
+
+场景按最大规模一次性分配粒子，调整画质只改变参与更新和绘制的前缀长度，
+不重新分配数组。
+"""
+import math
+
+
+class QualityGovernor:
+    def __init__(self, budget_ms=1000 / 60, min_quality=0.1, max_quality=1.0, smoothing=0.1,
+                 high=1.0, low=0.75, down_frames=10, up_frames=90, settle_frames=20,
+                 down_step=0.85, up_step=1.05):
+        self.budget_ms = budget_ms
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.quality = max_quality
+        self.smoothing = smoothing
+        self.high, self.low = high, low
+        self.down_frames, self.up_frames = down_frames, up_frames
+        self.settle_frames = settle_frames
+        self.down_step, self.up_step = down_step, up_step
+
+        self.average_ms = None
+        self._over = self._under = 0
+        self._settle = settle_frames
+
+    def update(self, frame_ms):
+        """记录一帧的工作时间（毫秒）；画质改变时返回True"""
+        if self.average_ms is None:
+            self.average_ms = frame_ms
+        else:
+            self.average_ms += (frame_ms - self.average_ms) * self.smoothing
+        if self._settle > 0:
+            self._settle -= 1
+            return False
+
+        if self.average_ms > self.budget_ms * self.high:
+            self._over += 1
+            self._under = 0
+        elif self.average_ms < self.budget_ms * self.low:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.down_frames:
+            return self._set(self.quality * self.down_step)
+        if self._under >= self.up_frames:
+            return self._set(self.quality * self.up_step)
+        return False
+
+    def _set(self, quality):
+        quality = min(self.max_quality, max(self.min_quality, quality))
+        self._over = self._under = 0
+        if math.isclose(quality, self.quality):
+            return False
+        self.quality = quality
+        self._settle = self.settle_frames
+        return True
+
+
+def scaled(maximum, quality, minimum=0):
+    """把画质换算成 [minimum, maximum] 之间的整数"""
+    return max(minimum, min(maximum, int(round(minimum + (maximum - minimum) * quality))))
+
+
+def add_governor_arguments(parser):
+    """--adaptive / --min-quality；预算沿用 frame_profiler 的 --budget-ms"""
+    parser.add_argument('--adaptive', action='store_true',
+                        help="根据帧时间自动调整粒子数和特效，守住 --budget-ms")
+    parser.add_argument('--min-quality', type=float, default=0.1, help="自适应画质的下限（0..1）")
+
+
+def governor_from_args(args):
+    if not args.adaptive:
+        return None
+    return QualityGovernor(args.budget_ms, min_quality=args.min_quality)
@@ -0,0 +1,213 @@
+"""NumPy splat光栅化：把大量小圆点累加到数组帧缓冲，一次传给pygame
+
+每个样本（粒子头或拖尾点）按 pygame.draw.circle 同样的像素覆盖范围“盖章”，
+所有样本的 alpha 和 alpha×颜色 累加到每个像素上，重叠的样本因此按权重合成
+而不是逐个覆盖：
+
+    覆盖率 A = min(1, Σa)      颜色 C = Σ(a·c) / Σa
+    像素 = 背景·(1 − A) + C·A
+
+累加有两种做法，resolve 按这一帧展开后的像素数选择，结果逐位相同：
+
+- 样本少：每个样本展开成核内的全部像素，只对被覆盖的像素分段求和；
+- 样本多、重叠严重：同半径的样本先按圆心像素 bincount 成整帧网格，再把网格
+  按圆形核的偏移平移相加，开销与帧面积成正比，与样本数无关。
+
+最后用 pygame.surfarray.blit_array 一次写入屏幕。
+"""
+import numpy as np
+import pygame
+
+# 展开后的像素数超过帧面积的这个倍数时，改为整帧网格累加（800×600下约1万个粒子）
+GRID_RATIO = 1
+
+
+def circle_kernel(radius):
+    """pygame.draw.circle(radius) 覆盖的像素相对圆心的偏移 (dx, dy)"""
+    size = 2 * radius + 3
+    surface = pygame.Surface((size, size))
+    pygame.draw.circle(surface, (255, 255, 255), (radius + 1, radius + 1), radius)
+    dx, dy = np.nonzero(pygame.surfarray.array2d(surface))
+    return dx - (radius + 1), dy - (radius + 1)
+
+
+def kernel_runs(dx, dy):
+    """把核按列拆成连续的竖直区间：{(dy起点, dy终点): [这个区间出现的列偏移dx, ...]}"""
+    runs = {}
+    for column in np.unique(dx).tolist():
+        rows = np.sort(dy[dx == column]).tolist()
+        first = rows[0]
+        for row, following in zip(rows, rows[1:] + [None]):
+            if following != row + 1:
+                runs.setdefault((first, row), []).append(column)
+                first = following
+    return runs
+
+
+def shift_add(target, source, offset, axis):
+    """target[i] += source[i - offset]（沿axis平移，移出边界的部分丢弃）"""
+    if offset >= 0:
+        into, outof = slice(offset, None), slice(None, source.shape[axis] - offset)
+    else:
+        into, outof = slice(None, offset), slice(-offset, None)
+    index = (slice(None),) * axis
+    target[index + (into,)] += source[index + (outof,)]
+
+
+class SplatRasterizer:
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self.kernels = {}
+        self.begin()
+
+    def resize(self, width, height):
+        self.width, self.height = width, height
+
+    def begin(self):
+        """开始新的一帧"""
+        # 半径 -> ([x], [y], [alpha], [预乘颜色 (N, 3)])
+        self._samples = {}
+
+    def splat(self, positions, colors, alpha, radius):
+        """累加一组同半径的样本
+
+        positions: (N, 2) 像素坐标（截断为整数，圆心不在屏幕内的样本丢弃）
+        colors:    (N, 3) RGB
+        alpha:     标量或 (N,) 的不透明度，0..1
+        """
+        if radius not in self.kernels:
+            dx, dy = circle_kernel(radius)
+            self.kernels[radius] = (dx, dy, kernel_runs(dx, dy))
+
+        w, h = self.width, self.height
+        centers = positions.astype(np.int64)
+        x, y = centers[:, 0], centers[:, 1]
+        alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float32), x.shape)
+        colors = np.asarray(colors)
+        visible = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+        if not visible.all():
+            x, y, alpha, colors = x[visible], y[visible], alpha[visible], colors[visible]
+        premultiplied = colors.astype(np.float32) * alpha[:, None]
+        for parts, values in zip(self._samples.setdefault(radius, ([], [], [], [])),
+                                 (x, y, alpha, premultiplied)):
+            parts.append(values)
+
+    def background_frame(self, background, background_alpha):
+        """没有样本覆盖时的帧（按尺寸和底色缓存）"""
+        key = (self.width, self.height, tuple(background), background_alpha)
+        if getattr(self, '_background_key', None) != key:
+            color = np.asarray(background, dtype=np.float64) * (1 - background_alpha)
+            self._background = np.empty((self.width, self.height, 3), dtype=np.uint8)
+            self._background[:] = color.astype(np.uint8)
+            # 每帧在同一块缓冲上合成和累加，不重新分配
+            self._frame = np.empty_like(self._background)
+            self._sums = np.empty((4, self.width, self.height))
+            self._run = np.empty((self.width, self.height))
+            self._background_key = key
+        return self._background
+
+    def resolve(self, background, background_alpha=0.0):
+        """合成为 (W, H, 3) uint8 帧（返回的数组在下一次resolve时被覆盖）
+
+        background:       背景RGB（屏幕底色）
+        background_alpha: 没有样本覆盖的像素上叠加的黑色不透明度（拖尾表面的底色）
+        """
+        self.background_frame(background, background_alpha)
+        frame = self._frame
+        frame[:] = self._background
+
+        samples = {radius: tuple(map(np.concatenate, parts)) for radius, parts in self._samples.items()}
+        expanded = sum(len(x) * len(self.kernels[radius][0]) for radius, (x, *_) in samples.items())
+        if expanded > self.width * self.height * GRID_RATIO:
+            self.composite_grid(frame, samples, background)
+        elif expanded:
+            self.composite_samples(frame, samples, background)
+
+        self.begin()
+        return frame
+
+    def composite_samples(self, frame, samples, background):
+        """样本少：每个样本展开成核内的像素，只累加被覆盖的像素"""
+        w, h = self.width, self.height
+        size = w * h
+        indices, alphas, premultiplied = [], [], ([], [], [])
+        for radius, (x, y, alpha, colors) in samples.items():
+            dx, dy, _ = self.kernels[radius]
+            px = x[:, None] + dx
+            py = y[:, None] + dy
+            # 列优先的线性下标，与surfarray的 (W, H) 布局一致
+            pixels = (px * h + py).ravel()
+            shape = px.shape
+            if x.size and (x.min() < radius or x.max() >= w - radius or y.min() < radius or y.max() >= h - radius):
+                # 裁掉屏幕外的部分
+                inside = ((px >= 0) & (px < w) & (py >= 0) & (py < h)).ravel()
+                pick = lambda values: np.broadcast_to(values[:, None], shape).ravel()[inside]
+                pixels = pixels[inside]
+            else:
+                pick = lambda values: np.broadcast_to(values[:, None], shape).ravel()
+            indices.append(pixels)
+            alphas.append(pick(alpha))
+            for channel in range(3):
+                premultiplied[channel].append(pick(colors[:, channel]))
+
+        indices = np.concatenate(indices)
+        if len(indices) < size // 8:
+            # 排序后按像素分段求和
+            order = np.argsort(indices)
+            indices = indices[order]
+            starts = np.flatnonzero(np.diff(indices)) + 1
+            starts = np.concatenate(([0], starts))
+            covered = indices[starts]
+            accumulate = lambda parts: np.add.reduceat(np.concatenate(parts)[order], starts)
+        else:
+            # 整帧bincount，再取出被覆盖的像素
+            coverage = np.bincount(indices, np.concatenate(alphas), size)
+            covered = np.flatnonzero(coverage)
+            accumulate = lambda parts: np.bincount(indices, np.concatenate(parts), size)[covered]
+
+        total = accumulate(alphas)
+        opacity = np.minimum(total, 1)
+        scale = (opacity / total)[:, None]
+        mixed = np.empty((len(covered), 3))
+        for channel, parts in enumerate(premultiplied):
+            mixed[:, channel] = accumulate(parts)
+        # 背景·(1 − A) + (Σa·c / Σa)·A
+        mixed *= scale
+        mixed += np.asarray(background, dtype=np.float64) * (1 - opacity)[:, None]
+        frame.reshape(size, 3)[covered] = mixed
+
+    def composite_grid(self, frame, samples, background):
+        """样本多、重叠严重：同半径的样本按圆心累加成整帧网格，再按核的偏移平移相加
+
+        核按列拆成连续的竖直区间：每个区间沿y平移累加一次，再按区间所在的列沿x
+        平移累加，开销与帧面积成正比，与样本数和重叠程度无关。
+        """
+        w, h = self.width, self.height
+        # [Σa, Σa·r, Σa·g, Σa·b]，形状 (4, W, H)
+        sums, run = self._sums, self._run
+        sums.fill(0)
+        for radius, (x, y, alpha, colors) in samples.items():
+            runs = self.kernels[radius][2]
+            index = x * h + y
+            for channel, weights in enumerate((alpha, colors[:, 0], colors[:, 1], colors[:, 2])):
+                centers = np.bincount(index, weights, w * h).reshape(w, h)
+                for (low, high), columns in runs.items():
+                    run.fill(0)
+                    for dy in range(low, high + 1):
+                        shift_add(run, centers, dy, 1)
+                    for dx in columns:
+                        shift_add(sums[channel], run, dx, 0)
+
+        # 只有非负数相加，没有样本覆盖的像素Σa正好是0，保持背景帧
+        total = sums[0]
+        covered = total > 0
+        opacity = np.minimum(total, 1)
+        mixed = sums[1:]
+        # 背景·(1 − A) + (Σa·c / Σa)·A
+        mixed *= opacity / np.where(covered, total, 1)
+        mixed += np.asarray(background, dtype=np.float64)[:, None, None] * (1 - opacity)
+        np.copyto(np.moveaxis(frame, 2, 0), mixed, casting='unsafe', where=covered)
+
+    def present(self, surface, background, background_alpha=0.0):
+        """合成并一次性写入surface"""
+        pygame.surfarray.blit_array(surface, self.resolve(background, background_alpha))
@@ -0,0 +1,114 @@
+"""圆形粒子精灵图集与批量blit
+
+pygame场景里的粒子都是实心圆。CircleAtlas 按 (半径, 量化颜色, 量化透明度)
+把圆预渲染到少数几张大的SRCALPHA图集页上；SpriteBatch 收集一帧里所有粒子的
+(图集页, 位置, 区域)，最后用一次 Surface.blits() 提交。热循环里不再创建任何Surface。
+
+    atlas = CircleAtlas()
+    batch = SpriteBatch(atlas)
+    for p in particles:
+        batch.add(x, y, radius, color, alpha)
+    batch.flush(screen)
+
+精灵按整数圆心绘制，和直接 pygame.draw.circle 的像素完全一致；
+颜色和透明度按 color_step / alpha_step 量化，步长为1时不做量化。
+width > 0 时是空心圆环，含义与 pygame.draw.circle 的 width 参数相同。
+
+注意精灵总是按alpha混合到目标上：直接在SRCALPHA表面上 draw.circle 会覆盖
+像素，重叠的半透明粒子在批量模式下会互相混合；在不带alpha的屏幕上画
+“带alpha颜色”的圆时 draw.circle 会忽略alpha，此时应传 alpha=255。
+"""
+import pygame
+
+# 原始参数快表的上限；颜色连续变化的场景里超过后直接清空重建
+LOOKUP_LIMIT = 1 << 16
+
+
+class CircleAtlas:
+    """按需填充的圆形精灵图集（货架式装箱）"""
+
+    def __init__(self, color_step=8, alpha_step=8, page_size=256):
+        self.color_step = color_step
+        self.alpha_step = alpha_step
+        self.page_size = page_size
+        self.pages = []
+        self.sprites = {}  # 量化后的键 -> 精灵
+        self._lookup = {}  # 原始参数 -> 精灵
+        self._shelf_x = self._shelf_y = self._shelf_height = page_size  # 强制首次分配新页
+
+    def _quantize(self, value, step):
+        if step <= 1:
+            return int(value)
+        return min(255, int(value + step / 2) // step * step)
+
+    def _allocate(self, size):
+        """在当前页上找一块 size×size 的空间，返回 (页, x, y)"""
+        if self._shelf_x + size > self.page_size:
+            # 换到下一排货架
+            self._shelf_y += self._shelf_height
+            self._shelf_x = 0
+            self._shelf_height = 0
+        if self._shelf_y + size > self.page_size:
+            self.pages.append(pygame.Surface((self.page_size, self.page_size), pygame.SRCALPHA))
+            self._shelf_x = self._shelf_y = self._shelf_height = 0
+
+        x, y = self._shelf_x, self._shelf_y
+        self._shelf_x += size
+        self._shelf_height = max(self._shelf_height, size)
+        return self.pages[-1], x, y
+
+    def sprite(self, radius, color, alpha=255, width=0):
+        """返回 (图集页, 区域Rect, 圆心偏移)；radius < 1 时返回 None（draw.circle也画不出）"""
+        # 先按原始参数查快表，命中时省掉量化计算
+        fast_key = (int(radius), color[0], color[1], color[2], int(alpha), width)
+        try:
+            return self._lookup[fast_key]
+        except KeyError:
+            pass
+
+        radius = int(radius)
+        key = (radius,
+               self._quantize(color[0], self.color_step),
+               self._quantize(color[1], self.color_step),
+               self._quantize(color[2], self.color_step),
+               self._quantize(alpha, self.alpha_step),
+               width)
+        if key not in self.sprites:
+            self.sprites[key] = self._render(key) if radius >= 1 else None
+
+        if len(self._lookup) >= LOOKUP_LIMIT:
+            self._lookup.clear()
+        sprite = self._lookup[fast_key] = self.sprites[key]
+        return sprite
+
+    def _render(self, key):
+        radius, r, g, b, a, width = key
+        # 圆心放在 (radius+1, radius+1)，四周留1像素，保证与draw.circle的覆盖范围一致
+        size = 2 * radius + 2
+        page, x, y = self._allocate(size)
+        area = pygame.Rect(x, y, size, size)
+        page.fill((0, 0, 0, 0), area)
+        pygame.draw.circle(page, (r, g, b, a), (x + radius + 1, y + radius + 1), radius, width)
+        return page, area, radius + 1
+
+
+class SpriteBatch:
+    """一帧的粒子绘制队列，flush时一次 Surface.blits() 提交"""
+
+    def __init__(self, atlas):
+        self.atlas = atlas
+        self.items = []
+
+    def add(self, x, y, radius, color, alpha=255, width=0):
+        sprite = self.atlas.sprite(radius, color, alpha, width)
+        if sprite is not None:
+            page, area, offset = sprite
+            self.items.append((page, (int(x) - offset, int(y) - offset), area))
+
+    def flush(self, target):
+        if self.items:
+            target.blits(self.items, doreturn=False)
+            self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,129 @@
+# 与仓库根目录的 frame_cache.py 相同：放在heart.py旁边，打包目录不依赖目录外的文件
+"""周期动画的帧缓存：每帧的画面压缩后存进内存映射文件，下一个周期直接回放
+
+    cache = FrameCache('heart_cycle.cache', frames=2056, size=(400, 300), key=cache_key(params))
+    frame = cache.get(index)
+    if frame is None:
+        render(screen)
+        cache.put(index, screen)
+    else:
+        screen.blit(frame, (0, 0))
+
+文件由48字节的文件头（魔数、帧数、宽、高、参数指纹、数据区容量）、每帧一条的
+索引（数据区内的偏移和长度）和数据区组成。每帧的RGB像素用zlib（级别1）压缩后
+追加到数据区：静态层大部分是纯色背景，400×300的一帧约9KB，解压不到1毫秒。
+索引长度为0表示这一帧还没画过；参数指纹、帧数或窗口大小改变时整个文件重建。
+
+数据区容量capacity是缓存占用的上限：写满后的帧不再缓存（put返回False），
+调用方照常实时绘制这些帧。文件是稀疏的，只有写过的部分占用磁盘，按需分页读入，
+占用的是操作系统的页缓存而不是进程内存；给定持久路径时，下次启动可以直接回放
+上次画好的周期。只依赖标准库和pygame。
+"""
+import math
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+import pygame
+
+MAGIC = b'HEARTFC2'
+HEADER = struct.Struct('<8sIIIQQ12x')
+ENTRY = struct.Struct('<II')
+DEFAULT_CAPACITY = 64 << 20
+COMPRESS_LEVEL = 1
+
+
+def cache_key(*params):
+    """参数指纹（非0）"""
+    return zlib.crc32(repr(params).encode()) | (1 << 32)
+
+
+def lock_frequencies(base_frames, frequencies, fps=60, tolerance=0.1, max_repeats=16):
+    """让几个周期运动和一个base_frames帧的基本周期一起循环
+
+    周期取基本周期的整数倍（cycle_frames帧），frequencies（弧度/秒）各取为
+    2π·fps/cycle_frames 的整数倍。选满足下面条件的最短周期：取整后各频率仍然互不相同
+    （先后次序不变），且与原值的相对误差都不超过tolerance。找不到时用max_repeats倍的周期。
+    返回 (cycle_frames, 调整后的频率元组)。
+    """
+    for repeats in range(1, max_repeats + 1):
+        cycle_frames = base_frames * repeats
+        omega = 2 * math.pi * fps / cycle_frames
+        multiples = [max(1, round(f / omega)) for f in frequencies]
+        locked = tuple(m * omega for m in multiples)
+        distinct = len(set(multiples)) == len(multiples)
+        if distinct and all(abs(l - f) <= tolerance * f for l, f in zip(locked, frequencies)):
+            break
+    return cycle_frames, locked
+
+
+class FrameCache:
+    def __init__(self, path, frames, size, key=1, capacity=DEFAULT_CAPACITY):
+        """path为None时使用匿名临时文件（不跨进程保留）；capacity为压缩数据的最大字节数"""
+        self.frames = frames
+        self.size = width, height = size
+        self.key = key
+        self.frame_bytes = width * height * 3
+        self.capacity = capacity
+        self.path = path
+        self.hits = self.misses = 0
+
+        header = HEADER.pack(MAGIC, frames, width, height, key, capacity)
+        self.data_start = HEADER.size + frames * ENTRY.size
+        length = self.data_start + capacity
+        if path is None:
+            self.file = tempfile.TemporaryFile()
+        else:
+            self.file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        if self.file.read(HEADER.size) != header or os.fstat(self.file.fileno()).st_size != length:
+            # 新文件，或参数/帧数/尺寸/容量不同：清空重建，所有索引长度为0
+            self.file.seek(0)
+            self.file.truncate(0)
+            self.file.write(header)
+            self.file.truncate(length)
+        self.map = mmap.mmap(self.file.fileno(), length)
+        self.view = memoryview(self.map)
+        # 数据区只追加：从已有记录的末尾继续写
+        self.used = max((offset + length for offset, length in map(self._entry, range(frames))), default=0)
+
+    def _entry(self, index):
+        """第index帧的 (数据区内偏移, 压缩后长度)"""
+        return ENTRY.unpack_from(self.map, HEADER.size + index * ENTRY.size)
+
+    def filled(self):
+        """已经画好的帧数"""
+        return sum(self._entry(i)[1] > 0 for i in range(self.frames))
+
+    def nbytes(self):
+        """数据区已用的字节数"""
+        return self.used
+
+    def get(self, index):
+        """第index帧的Surface，还没画过（或没放进缓存）时返回None"""
+        offset, size = self._entry(index)
+        if size == 0:
+            self.misses += 1
+            return None
+        self.hits += 1
+        start = self.data_start + offset
+        pixels = zlib.decompress(self.view[start:start + size], bufsize=self.frame_bytes)
+        return pygame.image.frombuffer(pixels, self.size, 'RGB')
+
+    def put(self, index, surface):
+        """把surface（大小必须等于缓存尺寸）存为第index帧；数据区放不下时返回False"""
+        data = zlib.compress(pygame.image.tobytes(surface, 'RGB'), COMPRESS_LEVEL)
+        if self.used + len(data) > self.capacity:
+            return False
+        start = self.data_start + self.used
+        self.view[start:start + len(data)] = data
+        # 数据写完再写索引，中途退出时这一帧仍视为未画
+        ENTRY.pack_into(self.map, HEADER.size + index * ENTRY.size, self.used, len(data))
+        self.used += len(data)
+        return True
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        self.file.close()
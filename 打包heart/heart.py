@@ -1,8 +1,14 @@
+import os
 import pygame
 import math
 import random
 from pygame.locals import *
 
+# 启动耗时测量（startup_report.py）：设置后画完第一帧就输出标记并退出
+FIRST_FRAME_EXIT = os.environ.get('HEART_FIRST_FRAME_EXIT') == '1'
+# 周期帧缓存：HEART_FRAME_CACHE=文件路径（跨启动保留）或1（临时文件）
+FRAME_CACHE = os.environ.get('HEART_FRAME_CACHE')
+
 
 class Vector3:
     """三维向量类"""
@@ -49,10 +55,14 @@ DEEP_PINK = (255, 20, 147)
 HOT_PINK = (255, 105, 180)
 SPEC_COLOR = (255, 255, 200)
 AMBIENT_COLOR = (255, 192, 203, 50)
+BACKGROUND = (30, 30, 50)
+
+# 光源方向三个分量的角频率（弧度/秒）
+LIGHT_FREQUENCIES = (1.0, 0.8, 0.6)
 
 
 class StereoHeart:
-    def __init__(self, width=400, height=300):
+    def __init__(self, width=400, height=300, frame_cache=None):
         self.screen = pygame.display.set_mode((width, height), RESIZABLE)
         self.clock = pygame.time.Clock()
         self.running = True
@@ -64,8 +74,11 @@ class StereoHeart:
         self.rotation = 0
         self.light_dir = Vector3(1, -1, 0.5).normalize()
 
-        # 动画参数
+        # 动画参数（每帧的增量）
         self.beat_phase = 0
+        self.beat_speed = 0.05
+        self.rotation_speed = 0.7
+        self.light_frequencies = LIGHT_FREQUENCIES
         self.particles = []
         self.heart_points = self.generate_3d_heart()
 
@@ -73,6 +86,14 @@ class StereoHeart:
         self.ambient_strength = 0.3
         self.specular_power = 20
 
+        # 可选：周期帧缓存。背景、光晕和心形只随周期变化，第一个周期边画边存，
+        # 之后直接回放，每帧只实时绘制粒子。frame_cache为文件路径或'1'（临时文件）
+        self.frame_cache = None
+        self.cycle_frames = None
+        if frame_cache:
+            self.cache_path = None if frame_cache == '1' else frame_cache
+            self.lock_cycle()
+
     def generate_3d_heart(self, samples=300):
         """生成3D心形顶点"""
         points = []
@@ -111,17 +132,40 @@ class StereoHeart:
         spec = diff ** self.specular_power
         return min(1.0, self.ambient_strength + diff + spec)
 
+    def lock_cycle(self):
+        """把旋转、心跳和光源调成同一个周期（同 g_heart_2.StereoHeart.lock_cycle）
+
+        默认参数下周期是4圈旋转、2056帧；光源沿原来的路径走，慢了约8%，心跳慢了约2%。
+        动画改由周期内的帧序号驱动，光源不再跟随实际时间。
+        """
+        # 只在开启帧缓存时才用到（frame_cache.py 与本文件同目录）
+        from frame_cache import lock_frequencies
+
+        rotation_frames = round(360 / self.rotation_speed)
+        self.rotation_speed = 360 / rotation_frames
+        self.cycle_frames, self.light_frequencies = lock_frequencies(rotation_frames, LIGHT_FREQUENCIES)
+        beats = max(1, round(self.cycle_frames * self.beat_speed / (2 * math.pi)))
+        self.beat_speed = 2 * math.pi * beats / self.cycle_frames
+        self.frame = 0
+
     def update_animation(self):
         """更新动画状态"""
-        self.beat_phase += 0.05
-        self.rotation += 0.7
+        if self.cycle_frames is None:
+            self.beat_phase += self.beat_speed
+            self.rotation += self.rotation_speed
+            time = pygame.time.get_ticks() / 1000
+        else:
+            self.frame = (self.frame + 1) % self.cycle_frames
+            self.beat_phase = self.frame * self.beat_speed
+            self.rotation = self.frame * self.rotation_speed
+            time = self.frame / 60
 
         # 更新光源方向
-        time = pygame.time.get_ticks() / 1000
+        fx, fy, fz = self.light_frequencies
         self.light_dir = Vector3(
-            math.cos(time),
-            math.sin(time * 0.8),
-            math.sin(time * 0.6)
+            math.cos(time * fx),
+            math.sin(time * fy),
+            math.sin(time * fz)
         ).normalize()
 
         # 生成粒子
@@ -149,13 +193,14 @@ class StereoHeart:
 
     def draw_scene(self):
         """绘制3D场景"""
-        self.screen.fill((30, 30, 50))
+        if self.cycle_frames is not None:
+            # 静态层来自帧缓存，粒子按深度排序后画在最上面
+            self.draw_cached_layer()
+            for obj in sorted(self.particles, key=lambda x: x['pos'].z, reverse=True):
+                self.draw_particle(obj)
+            return
 
-        # 环境光晕
-        glow = pygame.Surface((400, 400), pygame.SRCALPHA)
-        pygame.draw.circle(glow, AMBIENT_COLOR, (200, 200),
-                           180 + 30 * math.sin(self.beat_phase))
-        self.screen.blit(glow, (self.center[0] - 200, self.center[1] - 200))
+        self.draw_background()
 
         # 深度排序
         sorted_objects = sorted(
@@ -166,43 +211,86 @@ class StereoHeart:
 
         for obj in sorted_objects:
             if 'vel' in obj:  # 绘制粒子
-                pos = self.project_point(obj['pos'])
-                alpha = int(200 * obj['life'])
-                size = max(1, int(3 - abs(obj['pos'].z) / self.depth * 2))
-                color = (255, 255 - size * 40, 255 - size * 60, alpha)
-                pygame.draw.circle(self.screen, color, pos, size)
+                self.draw_particle(obj)
             else:  # 绘制心形
-                pos = self.project_point(obj['pos'])
-                intensity = self.calculate_lighting(obj['normal'])
-
-                # 计算基础颜色
-                base_color = Vector3.from_color(DEEP_PINK)
-                target_color = Vector3.from_color(HOT_PINK)
-                t = (obj['pos'].z + self.depth) / (2 * self.depth)
-                base_color = Vector3(
-                    base_color.x + (target_color.x - base_color.x) * t,
-                    base_color.y + (target_color.y - base_color.y) * t,
-                    base_color.z + (target_color.z - base_color.z) * t
-                )
-
-                # 计算高光颜色
-                spec_strength = intensity ** 5
-                spec_color = Vector3.from_color(SPEC_COLOR) * spec_strength
-
-                # 混合颜色
-                final_color = (base_color * intensity + spec_color).as_int()
-
-                # 绘制
-                radius = max(2, int(4 - abs(obj['pos'].z) / self.depth * 2))
-                pygame.draw.circle(self.screen, final_color, pos, radius)
-
-                # 添加高光点
-                if intensity > 0.7:
-                    highlight_pos = (
-                        pos[0] + obj['normal'].x * 5,
-                        pos[1] + obj['normal'].y * 5
-                    )
-                    pygame.draw.circle(self.screen, (255, 255, 255, 150), highlight_pos, 1)
+                self.draw_heart_point(obj)
+
+    def draw_background(self):
+        """背景和环境光晕"""
+        self.screen.fill(BACKGROUND)
+
+        # 环境光晕
+        glow = pygame.Surface((400, 400), pygame.SRCALPHA)
+        pygame.draw.circle(glow, AMBIENT_COLOR, (200, 200),
+                           180 + 30 * math.sin(self.beat_phase))
+        self.screen.blit(glow, (self.center[0] - 200, self.center[1] - 200))
+
+    def draw_particle(self, obj):
+        pos = self.project_point(obj['pos'])
+        alpha = int(200 * obj['life'])
+        size = max(1, int(3 - abs(obj['pos'].z) / self.depth * 2))
+        color = (255, 255 - size * 40, 255 - size * 60, alpha)
+        pygame.draw.circle(self.screen, color, pos, size)
+
+    def draw_heart_point(self, obj):
+        pos = self.project_point(obj['pos'])
+        intensity = self.calculate_lighting(obj['normal'])
+
+        # 计算基础颜色
+        base_color = Vector3.from_color(DEEP_PINK)
+        target_color = Vector3.from_color(HOT_PINK)
+        t = (obj['pos'].z + self.depth) / (2 * self.depth)
+        base_color = Vector3(
+            base_color.x + (target_color.x - base_color.x) * t,
+            base_color.y + (target_color.y - base_color.y) * t,
+            base_color.z + (target_color.z - base_color.z) * t
+        )
+
+        # 计算高光颜色
+        spec_strength = intensity ** 5
+        spec_color = Vector3.from_color(SPEC_COLOR) * spec_strength
+
+        # 混合颜色
+        final_color = (base_color * intensity + spec_color).as_int()
+
+        # 绘制
+        radius = max(2, int(4 - abs(obj['pos'].z) / self.depth * 2))
+        pygame.draw.circle(self.screen, final_color, pos, radius)
+
+        # 添加高光点
+        if intensity > 0.7:
+            highlight_pos = (
+                pos[0] + obj['normal'].x * 5,
+                pos[1] + obj['normal'].y * 5
+            )
+            pygame.draw.circle(self.screen, (255, 255, 255, 150), highlight_pos, 1)
+
+    def open_frame_cache(self):
+        """按当前窗口大小打开帧缓存；参数指纹涵盖所有影响静态层的设置"""
+        from frame_cache import FrameCache, cache_key
+
+        if self.frame_cache is not None:
+            self.frame_cache.close()
+        size = self.screen.get_size()
+        key = cache_key(size, self.center, self.heart_scale, self.depth, self.cycle_frames,
+                        self.beat_speed, self.light_frequencies, self.ambient_strength,
+                        self.specular_power, DEEP_PINK, HOT_PINK, SPEC_COLOR, AMBIENT_COLOR, BACKGROUND)
+        self.frame_cache = FrameCache(self.cache_path, self.cycle_frames, size, key)
+        # 心形顶点的深度次序固定，排一次即可（稳定排序，与整体排序里的先后相同）
+        self.sorted_heart = sorted(self.heart_points, key=lambda x: x['pos'].z, reverse=True)
+
+    def draw_cached_layer(self):
+        """回放周期里这一帧的静态层；还没画过时画出并存入缓存（缓存写满后照常实时绘制）"""
+        if self.frame_cache is None or self.frame_cache.size != self.screen.get_size():
+            self.open_frame_cache()
+        frame = self.frame_cache.get(self.frame)
+        if frame is not None:
+            self.screen.blit(frame, (0, 0))
+            return
+        self.draw_background()
+        for obj in self.sorted_heart:
+            self.draw_heart_point(obj)
+        self.frame_cache.put(self.frame, self.screen)
 
     def run(self):
         while self.running:
@@ -215,11 +303,17 @@ class StereoHeart:
             self.update_animation()
             self.draw_scene()
             pygame.display.flip()
+            if FIRST_FRAME_EXIT:
+                # 无控制台的打包程序里sys.stdout为None，直接写文件描述符
+                os.write(1, b'first-frame\n')
+                break
             self.clock.tick(60)
 
+        if self.frame_cache is not None:
+            self.frame_cache.close()
         pygame.quit()
 
 
 if __name__ == "__main__":
-    StereoHeart().run()
+    StereoHeart(frame_cache=FRAME_CACHE).run()
     pygame.quit()
\ No newline at end of file
@@ -0,0 +1,81 @@
+# -*- mode: python ; coding: utf-8 -*-
+# 精简打包配置：只带heart.py真正用到的模块，字节码按 -OO 预编译
+#
+#   pyinstaller heart_lean.spec                  # 单文件 dist/heart_lean
+#   pyinstaller heart_lean.spec -- --onedir      # 目录版 dist/heart_lean_dir/，启动时无需解压
+#
+# 单文件版每次启动都要把整个归档解压到临时目录，目录版直接从磁盘加载，
+# 冷启动更快。两者的首帧时间和体积可以用 startup_report.py 对比。
+import argparse
+
+options = argparse.ArgumentParser()
+options.add_argument('--onedir', action='store_true')
+options = options.parse_args()
+
+# heart.py 只依赖 pygame（和同目录下只用标准库的 frame_cache.py）；以下模块是构建环境里被顺带分析进来的
+EXCLUDES = [
+    'numpy', 'OpenGL', 'OpenGL_accelerate',
+    'setuptools', 'pkg_resources', 'distutils', '_distutils_hack', 'wheel', 'packaging',
+    'importlib_metadata', 'zipp', 'jaraco', 'backports',
+    'tkinter', 'unittest', 'pydoc', 'pydoc_data', 'doctest',
+    'asyncio', 'concurrent', 'multiprocessing', 'xmlrpc', 'http', 'email',
+    'sqlite3', 'lzma', 'bz2', 'ssl', 'decimal', 'csv',
+]
+
+a = Analysis(
+    ['heart.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=EXCLUDES,
+    noarchive=False,
+    optimize=2,
+)
+pyz = PYZ(a.pure)
+
+exe_options = dict(
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=True,
+    # UPX压缩的库在每次启动时都要解压，体积换来的是更慢的首帧
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+
+if options.onedir:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='heart_lean',
+        **exe_options,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=True,
+        upx=False,
+        name='heart_lean_dir',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='heart_lean',
+        runtime_tmpdir=None,
+        **exe_options,
+    )
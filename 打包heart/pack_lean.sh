@@ -0,0 +1,6 @@
+#!/bin/sh
+# 精简打包：单文件版和目录版，然后对比首帧时间和体积
+set -e
+pyinstaller --noconfirm heart_lean.spec
+pyinstaller --noconfirm heart_lean.spec -- --onedir
+python startup_report.py dist/heart_lean dist/heart_lean_dir/heart_lean
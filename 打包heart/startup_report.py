@@ -0,0 +1,85 @@
+"""打包产物的首帧时间和体积对比
+
+每个目标启动 --runs 次，环境变量 HEART_FIRST_FRAME_EXIT=1 让 heart.py
+画完第一帧就输出 first-frame 并退出，计时从创建进程到读到这个标记为止：
+
+    python startup_report.py dist/heart dist/heart_lean dist/heart_lean_dir/heart_lean
+    python startup_report.py --runs 20 "python heart.py" dist/heart_lean
+
+目标是可执行文件时统计体积（目录版统计所在目录的总大小），
+含空格的目标按命令行执行，只计时不统计体积。
+没有显示器时用 SDL_VIDEODRIVER=dummy 运行。
+"""
+import argparse
+import os
+import queue
+import shlex
+import statistics
+import subprocess
+import threading
+import time
+
+MARKER = b'first-frame'
+
+
+def bundle_size(path):
+    """单文件返回文件大小；目录版（可执行文件旁有_internal）返回整个目录的大小"""
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(os.path.join(directory, '_internal')):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(directory):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def first_frame_time(command, env, timeout):
+    """启动一次，返回读到首帧标记的耗时（秒）；timeout秒内没有读到时结束进程并报错"""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env)
+    # 逐行读stdout会一直阻塞，放到线程里读，主线程最多等timeout秒
+    marks = queue.Queue()
+
+    def read():
+        for line in process.stdout:
+            if line.startswith(MARKER):
+                marks.put(time.perf_counter() - start)
+        marks.put(None)  # stdout关闭：进程已经退出
+
+    threading.Thread(target=read, daemon=True).start()
+    try:
+        elapsed = marks.get(timeout=timeout)
+        process.wait(timeout)
+    except (queue.Empty, subprocess.TimeoutExpired):
+        process.kill()
+        process.wait()
+        raise RuntimeError(f"{command[0]} 在 {timeout:g} 秒内没有画出第一帧并退出，已结束进程") from None
+    if elapsed is None:
+        raise RuntimeError(f"{command[0]} 退出前没有画出第一帧（返回码 {process.returncode}）")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="打包产物的首帧时间和体积对比")
+    parser.add_argument('targets', nargs='+', help="可执行文件，或用引号括起的命令行")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=1, help="不计入结果的预热次数（填充磁盘缓存）")
+    parser.add_argument('--timeout', type=float, default=30, help="每次启动等待首帧和退出的秒数，超时结束进程")
+    args = parser.parse_args()
+
+    env = dict(os.environ, HEART_FIRST_FRAME_EXIT='1', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    env.setdefault('SDL_VIDEODRIVER', 'dummy')
+    env.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+    print(f"{'target':<40}{'median ms':>11}{'min ms':>9}{'max ms':>9}{'size MB':>10}")
+    for target in args.targets:
+        command = shlex.split(target) if ' ' in target else [os.path.abspath(target)]
+        for _ in range(args.warmup):
+            first_frame_time(command, env, args.timeout)
+        times = [first_frame_time(command, env, args.timeout) * 1000 for _ in range(args.runs)]
+        size = f"{bundle_size(target) / 2 ** 20:10.1f}" if ' ' not in target else f"{'-':>10}"
+        print(f"{target:<40}{statistics.median(times):>11.1f}{min(times):>9.1f}{max(times):>9.1f}{size}")
+
+
+if __name__ == '__main__':
+    main()